@@ -1,144 +1,391 @@
 import streamlit as st
+import streamlit.components.v1 as components
 import folium
 from streamlit_folium import st_folium
+import shapely
 from shapely.geometry import Polygon
-from shapely.geometry import box, Point
-from shapely.affinity import rotate, translate
 import math
+import functools
+import collections
 import numpy as np
-import pydeck as pdk
-import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
 import urllib3
+from urllib3.util.retry import Retry
 import urllib.parse
 import logging
-from datetime import datetime
+import logging.handlers
+from concurrent.futures import ThreadPoolExecutor
+import time
+from pathlib import Path
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 
-st.set_page_config(page_title="Parking Space Estimator", layout="wide", initial_sidebar_state="expanded")
+# All outbound requests use verify=False for corporate network compatibility
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
 # Custom CSS to make sidebar wider and handle collapse properly
-st.markdown("""
-    <style>
-        /* Sidebar width when expanded */
-        section[data-testid="stSidebar"]:not([aria-expanded="false"]) {
-            width: 400px !important;
-            min-width: 400px !important;
-        }
-        section[data-testid="stSidebar"]:not([aria-expanded="false"]) > div {
-            width: 400px !important;
-        }
-        
-        /* Prevent overflow when collapsed */
-        section[data-testid="stSidebar"] {
-            overflow-x: hidden !important;
-        }
-        section[data-testid="stSidebar"] > div {
-            overflow-x: hidden !important;
-        }
-        
-        /* Hide content properly when collapsed */
-        section[data-testid="stSidebar"][aria-expanded="false"] > div {
-            display: none !important;
-        }
-    </style>
-""", unsafe_allow_html=True)
+SIDEBAR_CSS_PATH = Path(__file__).with_name("style.css")
+
+# Basemap information shown in the sidebar
+BASEMAP_INFO = {
+    "Esri World Imagery": "**Update Frequency:** Quarterly to annually\n\n**Resolution:** 30cm-1m in urban areas\n\n**Coverage:** Global",
+    "Google Satellite": "**Update Frequency:** Monthly to annually\n\n**Resolution:** 15cm-1m\n\n**Coverage:** Global",
+    "Esri Clarity (High-Res)": "**Update Frequency:** Annually\n\n**Resolution:** 30-50cm\n\n**Coverage:** Global",
+    "USDA NAIP (via Esri)": "**Update Frequency:** Every 2-3 years\n\n**Resolution:** 60cm-1m\n\n**Coverage:** Continental US only",
+    "OpenStreetMap": "**Update Frequency:** Real-time\n\n**Resolution:** Vector data\n\n**Coverage:** Global"
+}
+
+# Tile endpoints per basemap; OpenStreetMap uses folium's built-in tiles
+BASEMAP_ENDPOINTS = {
+    "Esri World Imagery": {
+        'url': 'https://server.arcgisonline.com/ArcGIS/rest/services/World_Imagery/MapServer/tile/{z}/{y}/{x}',
+        'attr': 'Esri'
+    },
+    "Google Satellite": {
+        'url': 'https://mt1.google.com/vt/lyrs=s&x={x}&y={y}&z={z}',
+        'attr': 'Google'
+    },
+    "Esri Clarity (High-Res)": {
+        'url': 'https://clarity.maptiles.arcgis.com/arcgis/rest/services/World_Imagery/MapServer/tile/{z}/{y}/{x}',
+        'attr': 'Esri Clarity'
+    },
+    "USDA NAIP (via Esri)": {
+        'url': 'https://naip.arcgis.com/arcgis/rest/services/NAIP/ImageServer/tile/{z}/{y}/{x}',
+        'attr': 'USDA NAIP'
+    },
+    "OpenStreetMap": {
+        'url': 'OpenStreetMap',
+        'attr': 'OpenStreetMap'
+    }
+}
+
+# Map drawing tools: only polygons and rectangles describe a parking area
+DRAW_OPTIONS = {
+    'polyline': False,
+    'rectangle': True,
+    'polygon': True,
+    'circle': False,
+    'marker': False,
+    'circlemarker': False,
+}
+DRAW_EDIT_OPTIONS = {'edit': True}
+
+# Leaflet path style shared by every generated parking space on the 2D map
+PARKING_SPACE_STYLE = {
+    'color': '#FFA500',
+    'weight': 2,
+    'fillColor': '#FFD700',
+    'fillOpacity': 0.3,
+}
+
+# Basemaps that are always offered; NAIP is added only while it's reachable
+BASEMAP_OPTIONS_BASE = ("Esri World Imagery", "Google Satellite", "Esri Clarity (High-Res)")
+
+# 3D view scale limits, in spaces across all levels. Above HEAVY_SCENE_SPACES the per-face
+# wireframe and hover highlight give way to a flat outline layer, which is itself skipped above
+# MAX_OUTLINED_SPACES; at MAX_PICKABLE_SPACES picking (and with it hover tooltips) is turned off
+HEAVY_SCENE_SPACES = 500
+MAX_OUTLINED_SPACES = 5000
+MAX_PICKABLE_SPACES = 2000
+
+# Generated layouts kept per session, so switching back to a recent layout (e.g. toggling
+# Optimized and Conservative) reuses its spaces instead of generating them again
+LAYOUT_CACHE_ENTRIES = 8
+
+# Per-level RGBA colors for the 3D view and its legend; extra levels reuse the last color
+UNDERGROUND_LEVEL_COLORS = [
+    [0, 150, 255, 230],
+    [0, 200, 255, 230],
+    [100, 220, 255, 230],
+    [150, 240, 255, 230],
+    [200, 250, 255, 230],
+]
+ABOVEGROUND_LEVEL_COLORS = [
+    [0, 200, 0, 230],
+    [255, 230, 0, 230],
+    [255, 165, 0, 230],
+    [255, 50, 50, 230],
+    [200, 0, 255, 230],
+    [255, 20, 147, 230],
+    [0, 255, 255, 230],
+    [255, 100, 0, 230],
+    [220, 100, 255, 230],
+    [50, 255, 150, 230],
+]
+
+# Unit conversion factors
+FEET_PER_METER = 3.28084
+SQFT_PER_SQM = FEET_PER_METER ** 2  # 10.7639...; derived so area and length conversions agree
+
+# Mean Earth radius in meters, for areas of drawn lon/lat polygons
+EARTH_RADIUS_M = 6371008.8
+
+# Conservative (space width, space length, aisle width) in feet per parking type category
+CONSERVATIVE_DIMS_FT = {
+    'perpendicular': (9.0, 19.0, 26.0),  # Also used for compact
+    'angled': (9.0, 20.0, 16.0),
+    'parallel': (9.0, 24.0, 14.0),
+}
+
+# Default space dimensions per (parking type, unit system), as number_input kwargs
+PARKING_DEFAULTS = {
+    ("Standard Perpendicular (90°)", "Imperial"): {
+        'space_width': dict(value=8.2, min_value=6.5, max_value=11.5, step=0.5),
+        'space_length': dict(value=16.4, min_value=14.8, max_value=19.7, step=0.5),
+        'aisle_width': dict(value=19.7, min_value=16.4, max_value=26.2, step=1.0),
+        'efficiency': 0.85,
+        'area_per_space': 400,
+    },
+    ("Standard Perpendicular (90°)", "Metric"): {
+        'space_width': dict(value=2.5, min_value=2.0, max_value=3.5, step=0.1),
+        'space_length': dict(value=5.0, min_value=4.5, max_value=6.0, step=0.1),
+        'aisle_width': dict(value=6.0, min_value=5.0, max_value=8.0, step=0.5),
+        'efficiency': 0.85,
+        'area_per_space': 37.2,
+    },
+    ("Angled (45°)", "Imperial"): {
+        'space_width': dict(value=8.2, min_value=6.5, max_value=11.5, step=0.5),
+        'space_length': dict(value=18.0, min_value=16.4, max_value=21.3, step=0.5),
+        'aisle_width': dict(value=13.1, min_value=11.5, max_value=19.7, step=1.0),
+        'efficiency': 0.80,
+        'area_per_space': 450,
+    },
+    ("Angled (45°)", "Metric"): {
+        'space_width': dict(value=2.5, min_value=2.0, max_value=3.5, step=0.1),
+        'space_length': dict(value=5.5, min_value=5.0, max_value=6.5, step=0.1),
+        'aisle_width': dict(value=4.0, min_value=3.5, max_value=6.0, step=0.5),
+        'efficiency': 0.80,
+        'area_per_space': 41.8,
+    },
+    ("Parallel", "Imperial"): {
+        'space_width': dict(value=8.2, min_value=6.5, max_value=9.8, step=0.5),
+        'space_length': dict(value=21.3, min_value=19.7, max_value=26.2, step=0.5),
+        'aisle_width': dict(value=11.5, min_value=9.8, max_value=16.4, step=1.0),
+        'efficiency': 0.65,
+        'area_per_space': 550,
+    },
+    ("Parallel", "Metric"): {
+        'space_width': dict(value=2.5, min_value=2.0, max_value=3.0, step=0.1),
+        'space_length': dict(value=6.5, min_value=6.0, max_value=8.0, step=0.1),
+        'aisle_width': dict(value=3.5, min_value=3.0, max_value=5.0, step=0.5),
+        'efficiency': 0.65,
+        'area_per_space': 51.1,
+    },
+    ("Compact", "Imperial"): {
+        'space_width': dict(value=7.5, min_value=6.5, max_value=9.2, step=0.5),
+        'space_length': dict(value=14.8, min_value=13.1, max_value=18.0, step=0.5),
+        'aisle_width': dict(value=18.0, min_value=16.4, max_value=23.0, step=1.0),
+        'efficiency': 0.87,
+        'area_per_space': 350,
+    },
+    ("Compact", "Metric"): {
+        'space_width': dict(value=2.3, min_value=2.0, max_value=2.8, step=0.1),
+        'space_length': dict(value=4.5, min_value=4.0, max_value=5.5, step=0.1),
+        'aisle_width': dict(value=5.5, min_value=5.0, max_value=7.0, step=0.5),
+        'efficiency': 0.87,
+        'area_per_space': 32.5,
+    },
+}
+
+# Floor height inputs per (structure type, unit system)
+FLOOR_HEIGHT_DEFAULTS = {
+    ("Parking Structure (3D)", "Imperial"): dict(min_value=8.0, max_value=16.0, value=11.5, step=0.5, help="Height between floors"),
+    ("Parking Structure (3D)", "Metric"): dict(min_value=2.5, max_value=5.0, value=3.5, step=0.5, help="Height between floors"),
+    ("Underground Parking (3D)", "Imperial"): dict(min_value=8.0, max_value=13.0, value=10.0, step=0.5, help="Height between underground floors"),
+    ("Underground Parking (3D)", "Metric"): dict(min_value=2.5, max_value=4.0, value=3.0, step=0.5, help="Height between underground floors"),
+}
+
+# Level count input (label, number_input kwargs) per 3D structure type
+NUM_LEVELS_INPUTS = {
+    "Parking Structure (3D)": ("Number of Levels", dict(min_value=1, max_value=10, value=3, help="Number of parking levels in the structure")),
+    "Underground Parking (3D)": ("Number of Underground Levels", dict(min_value=1, max_value=5, value=2, help="Number of underground parking levels")),
+}
+
+# Corner island size limits per unit system; the default follows the layout mode
+CORNER_ISLAND_INPUTS = {
+    "Imperial": dict(min_value=10.0, max_value=80.0, step=5.0),
+    "Metric": dict(min_value=3.0, max_value=24.0, step=1.0),
+}
+
+st.set_page_config(page_title="Parking Space Estimator", layout="wide", initial_sidebar_state="expanded")
+
+# Read the stylesheet from disk once per process; it still has to be emitted every rerun
+# because Streamlit drops any element a rerun doesn't re-render
+@st.cache_data(show_spinner=False)
+def load_css():
+    """Return the contents of style.css"""
+    return SIDEBAR_CSS_PATH.read_text()
+
+st.markdown(f"<style>{load_css()}</style>", unsafe_allow_html=True)
 st.title("🅿️ Parking Space Estimator")
 st.markdown("Draw a polygon on the map to estimate how many parking spaces could fit in the area.")
 
-# Initialize app logs in session state
-if 'app_logs' not in st.session_state:
-    st.session_state.app_logs = []
+# Initialize session state (built each run, so mutable defaults are never shared between sessions)
+SESSION_DEFAULTS = {
+    'app_logs': collections.deque(maxlen=500),  # Bounded so long sessions don't grow without limit
+    'polygon_coords': None,
+    'polygon_center': None,
+    'polygon_zoom': None,
+    'map_center': [41.8781, -87.6298],  # Chicago
+    'map_zoom': 18,
+    'show_layout': False,
+    'layout_params': None,
+    'calculation_results': None,
+    'naip_available': True,  # Optimistic until NAIP is selected or tested
+    'naip_checked_at': 0.0,  # time.monotonic() of the last NAIP result, for NAIP_RECHECK_SECONDS
+    'basemap_status': {},  # Filled in on demand from the Connectivity panel
+    'last_basemap_view': None,  # (basemap, center, zoom) last logged as loaded
+    'layout_cache': {},  # layout key -> generated spaces, most recently used last
+}
+for key, value in SESSION_DEFAULTS.items():
+    st.session_state.setdefault(key, value)
 
 def add_app_log(message, level="INFO"):
     """Add a log entry to the session state for display"""
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
     log_entry = f"[{timestamp}] {level}: {message}"
     st.session_state.app_logs.append(log_entry)
 
-# Set up file logging
-logging.basicConfig(
-    filename='parking_estimator_errors.log',
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
+# Set up file logging once per process; the log rotates at ~1 MB
+@st.cache_resource
+def get_logger():
+    logger = logging.getLogger("parking_estimator")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    # The logger is process-global, so a cache clear must not attach a second handler
+    if not logger.handlers:
+        handler = logging.handlers.RotatingFileHandler(
+            'parking_estimator_errors.log',
+            maxBytes=1_000_000,
+            backupCount=3
+        )
+        handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+        logger.addHandler(handler)
+    return logger
+
+logger = get_logger()
+
+# Shared HTTP session so probes and geocoding reuse keep-alive connections across reruns
+@st.cache_resource
+def get_http_session():
+    session = requests.Session()
+    # Session-wide User-Agent (Nominatim requires one). verify=False stays on each call:
+    # a session-level verify is overridden by REQUESTS_CA_BUNDLE / CURL_CA_BUNDLE
+    session.headers.update({'User-Agent': 'parking_estimator_app_v1'})
+    adapter = HTTPAdapter(
+        pool_connections=10,
+        pool_maxsize=10,
+        # Retry a failed connect once; a read timeout is raised as-is (no retry), so the caller's timeout is the real cap
+        max_retries=Retry(total=1, read=False, backoff_factor=0.2)
+    )
+    session.mount("https://", adapter)
+    return session
+
+# (connect, read) timeout for endpoint probes; an unreachable host fails fast on connect
+PROBE_TIMEOUT = (2, 3)
+
+# Probe results are shared for this long; a session's failed NAIP check expires after the same time
+PROBE_CACHE_TTL = 300
+NAIP_RECHECK_SECONDS = PROBE_CACHE_TTL
+
+def probe_url(url):
+    """HEAD a URL for liveness, falling back to GET if the server rejects HEAD"""
+    response = get_http_session().head(url, verify=False, timeout=PROBE_TIMEOUT, allow_redirects=True)
+    if response.status_code in (405, 501):
+        response = get_http_session().get(url, verify=False, timeout=PROBE_TIMEOUT)
+    return response
 
 # Test endpoint availability with logging
+# Probe results are cached for 5 minutes and shared across sessions
+@st.cache_data(ttl=PROBE_CACHE_TTL, show_spinner=False)
 def test_endpoint_availability(name, url):
     try:
-        urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-        
-        logging.info(f"Testing {name} endpoint: {url}")
+        logger.info(f"Testing {name} endpoint: {url}")
         add_app_log(f"Testing {name} endpoint", "INFO")
         
-        response = requests.get(url, verify=False, timeout=5)
+        response = probe_url(url)
         
         if response.status_code == 200:
-            logging.info(f"{name} endpoint SUCCESS - Status: {response.status_code}")
+            logger.info(f"{name} endpoint SUCCESS - Status: {response.status_code}")
             add_app_log(f"{name} endpoint SUCCESS", "INFO")
             return True
         else:
-            logging.error(f"{name} endpoint FAILED - Status: {response.status_code}, Response: {response.text[:200]}")
+            logger.error(f"{name} endpoint FAILED - Status: {response.status_code}, Response: {response.text[:200]}")
             add_app_log(f"{name} endpoint FAILED - Status: {response.status_code}", "ERROR")
             return False
             
     except requests.exceptions.Timeout as e:
-        logging.error(f"{name} endpoint TIMEOUT - {str(e)}")
+        logger.error(f"{name} endpoint TIMEOUT - {str(e)}")
         add_app_log(f"{name} endpoint TIMEOUT", "ERROR")
         return False
     except requests.exceptions.ConnectionError as e:
-        logging.error(f"{name} endpoint CONNECTION ERROR - {str(e)}")
+        logger.error(f"{name} endpoint CONNECTION ERROR - {str(e)}")
         add_app_log(f"{name} endpoint CONNECTION ERROR", "ERROR")
         return False
     except Exception as e:
-        logging.error(f"{name} endpoint UNKNOWN ERROR - {type(e).__name__}: {str(e)}")
+        logger.error(f"{name} endpoint UNKNOWN ERROR - {type(e).__name__}: {str(e)}")
         add_app_log(f"{name} endpoint ERROR: {type(e).__name__}", "ERROR")
         return False
 
 # Test NAIP endpoint availability
+@st.cache_data(ttl=PROBE_CACHE_TTL, show_spinner=False)
 def test_naip_availability():
     try:
-        urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-        
         service_url = "https://naip.arcgis.com/arcgis/rest/services/NAIP/ImageServer?f=json"
-        logging.info(f"Testing NAIP service endpoint: {service_url}")
+        logger.info(f"Testing NAIP service endpoint: {service_url}")
         add_app_log(f"Testing NAIP service endpoint", "INFO")
         
-        response = requests.get(service_url, verify=False, timeout=5)
+        response = probe_url(service_url)
         
         if response.status_code != 200:
-            logging.error(f"NAIP service FAILED - Status: {response.status_code}")
+            logger.error(f"NAIP service FAILED - Status: {response.status_code}")
             add_app_log(f"NAIP service FAILED - Status: {response.status_code}", "ERROR")
             return False
         
         tile_url = "https://naip.arcgis.com/arcgis/rest/services/NAIP/ImageServer/tile/10/200/400"
-        logging.info(f"Testing NAIP tile availability: {tile_url}")
+        logger.info(f"Testing NAIP tile availability: {tile_url}")
         add_app_log(f"Testing NAIP tile availability", "INFO")
         
-        tile_response = requests.get(tile_url, verify=False, timeout=5)
+        # Stream the tile and stop once it's clearly a real image instead of downloading all of it
+        with get_http_session().get(tile_url, verify=False, timeout=PROBE_TIMEOUT, stream=True) as tile_response:
+            tile_size = 0
+            for chunk in tile_response.iter_content(chunk_size=1024):
+                tile_size += len(chunk)
+                if tile_size > 1000:
+                    break
         
-        if tile_response.status_code == 200 and len(tile_response.content) > 1000:
-            logging.info(f"NAIP tiles available - Status: {tile_response.status_code}")
+        if tile_response.status_code == 200 and tile_size > 1000:
+            logger.info(f"NAIP tiles available - Status: {tile_response.status_code}")
             add_app_log(f"NAIP tiles AVAILABLE", "INFO")
             return True
         else:
-            logging.error(f"NAIP tiles unavailable - Status: {tile_response.status_code}, Size: {len(tile_response.content)}")
+            logger.error(f"NAIP tiles unavailable - Status: {tile_response.status_code}, Size: {tile_size}")
             add_app_log(f"NAIP tiles UNAVAILABLE (service running but no imagery)", "ERROR")
             return False
             
     except requests.exceptions.Timeout as e:
-        logging.error(f"NAIP endpoint TIMEOUT - {str(e)}")
+        logger.error(f"NAIP endpoint TIMEOUT - {str(e)}")
         add_app_log(f"NAIP endpoint TIMEOUT", "ERROR")
         return False
     except requests.exceptions.ConnectionError as e:
-        logging.error(f"NAIP endpoint CONNECTION ERROR - {str(e)}")
+        logger.error(f"NAIP endpoint CONNECTION ERROR - {str(e)}")
         add_app_log(f"NAIP endpoint CONNECTION ERROR", "ERROR")
         return False
     except Exception as e:
-        logging.error(f"NAIP endpoint UNKNOWN ERROR - {type(e).__name__}: {str(e)}")
+        logger.error(f"NAIP endpoint UNKNOWN ERROR - {type(e).__name__}: {str(e)}")
         add_app_log(f"NAIP endpoint ERROR: {type(e).__name__}", "ERROR")
         return False
 
+def _probe_executor(max_workers):
+    """Thread pool whose workers share the current script context (for session logs)"""
+    return ThreadPoolExecutor(
+        max_workers=max_workers,
+        initializer=add_script_run_ctx,
+        initargs=(None, get_script_run_ctx())
+    )
+
 # Test all basemap endpoints on startup
+@st.cache_data(ttl=PROBE_CACHE_TTL, show_spinner=False)
 def test_all_basemaps():
     basemap_urls = {
         "Esri World Imagery": "https://server.arcgisonline.com/ArcGIS/rest/services/World_Imagery/MapServer?f=json",
@@ -146,38 +393,309 @@ def test_all_basemaps():
         "Esri Clarity": "https://clarity.maptiles.arcgis.com/arcgis/rest/services/World_Imagery/MapServer?f=json",
     }
     
-    results = {}
-    for name, url in basemap_urls.items():
-        results[name] = test_endpoint_availability(name, url)
+    with _probe_executor(len(basemap_urls)) as executor:
+        futures = {name: executor.submit(test_endpoint_availability, name, url) for name, url in basemap_urls.items()}
+        results = {name: future.result() for name, future in futures.items()}
     
     return results
 
-# Check NAIP availability on startup
-if 'naip_available' not in st.session_state:
-    st.session_state.naip_available = test_naip_availability()
-
-# Check all basemaps on first load
-if 'basemap_status' not in st.session_state:
-    with st.spinner("Testing basemap connections..."):
-        st.session_state.basemap_status = test_all_basemaps()
-
-# Initialize session state
-if 'polygon_coords' not in st.session_state:
-    st.session_state.polygon_coords = None
-if 'polygon_center' not in st.session_state:
-    st.session_state.polygon_center = None
-if 'polygon_zoom' not in st.session_state:
-    st.session_state.polygon_zoom = None
-if 'map_center' not in st.session_state:
-    st.session_state.map_center = [41.8781, -87.6298]  # Chicago
-if 'map_zoom' not in st.session_state:
-    st.session_state.map_zoom = 18
-if 'show_layout' not in st.session_state:
-    st.session_state.show_layout = False
-if 'layout_params' not in st.session_state:
-    st.session_state.layout_params = None
-if 'calculation_results' not in st.session_state:
-    st.session_state.calculation_results = None
+def run_endpoint_checks():
+    """Probe NAIP and the basemaps concurrently; returns (naip_available, basemap_status)"""
+    with _probe_executor(2) as executor:
+        naip_future = executor.submit(test_naip_availability)
+        basemap_future = executor.submit(test_all_basemaps)
+        return naip_future.result(), basemap_future.result()
+
+def clear_endpoint_cache():
+    """Drop cached probe results so the next check hits the network"""
+    test_endpoint_availability.clear()
+    test_naip_availability.clear()
+    test_all_basemaps.clear()
+
+# (connect, read) timeout for geocoding. Read timeouts are not retried, so a stalled lookup
+# reaches the Timeout handler after ~5 s; only a failed connect is retried once
+GEOCODE_TIMEOUT = (3, 5)
+
+# Geocode an address with Nominatim; results are cached for a day per address, for the most recent 256 addresses
+@st.cache_data(ttl=24*60*60, max_entries=256, show_spinner=False)
+def geocode(address):
+    """Return (lat, lon, display_name) for an address, or None if nothing matched"""
+    encoded_address = urllib.parse.quote(address)
+    url = f"https://nominatim.openstreetmap.org/search?q={encoded_address}&format=json&limit=1"
+    
+    logger.info(f"Geocoding request for address: {address}")
+    add_app_log(f"Geocoding address: {address}", "INFO")
+    
+    response = get_http_session().get(url, verify=False, timeout=GEOCODE_TIMEOUT)
+    
+    # Raise instead of returning so failed lookups are not cached
+    if response.status_code != 200:
+        raise requests.exceptions.HTTPError(f"Geocoding failed with status {response.status_code}", response=response)
+    
+    results = response.json()
+    if not results:
+        return None
+    
+    location = results[0]
+    return float(location['lat']), float(location['lon']), location.get('display_name', address)
+
+# Corner offsets of a space relative to its anchor point; only a handful of distinct
+# shapes occur per layout, so the trig and arithmetic is done once per shape
+@functools.lru_cache(maxsize=32)
+def space_offsets(width_deg, length_deg, orientation='horizontal', direction=1, angle_rad=0):
+    """Corner (dx, dy) offsets of a parking space, closed ring"""
+    if orientation == 'horizontal':
+        if angle_rad == 0:  # Perpendicular
+            if direction == 1:
+                return (
+                    (0, 0),
+                    (width_deg, 0),
+                    (width_deg, length_deg),
+                    (0, length_deg),
+                    (0, 0)
+                )
+            else:
+                return (
+                    (0, 0),
+                    (width_deg, 0),
+                    (width_deg, -length_deg),
+                    (0, -length_deg),
+                    (0, 0)
+                )
+        else:  # Angled
+            offset = length_deg * math.sin(angle_rad)
+            depth = length_deg * math.cos(angle_rad)
+            if direction == 1:
+                return (
+                    (0, 0),
+                    (width_deg, 0),
+                    (width_deg + offset, depth),
+                    (offset, depth),
+                    (0, 0)
+                )
+            else:
+                return (
+                    (0, 0),
+                    (width_deg, 0),
+                    (width_deg - offset, -depth),
+                    (-offset, -depth),
+                    (0, 0)
+                )
+    else:  # vertical orientation
+        if angle_rad == 0:  # Perpendicular
+            if direction == 1:
+                return (
+                    (0, 0),
+                    (length_deg, 0),
+                    (length_deg, width_deg),
+                    (0, width_deg),
+                    (0, 0)
+                )
+            else:
+                return (
+                    (0, 0),
+                    (-length_deg, 0),
+                    (-length_deg, width_deg),
+                    (0, width_deg),
+                    (0, 0)
+                )
+        else:  # Angled vertical
+            offset = length_deg * math.sin(angle_rad)
+            depth = length_deg * math.cos(angle_rad)
+            if direction == 1:
+                return (
+                    (0, 0),
+                    (depth, 0),
+                    (depth, width_deg + offset),
+                    (0, width_deg + offset),
+                    (0, 0)
+                )
+            else:
+                return (
+                    (0, 0),
+                    (-depth, 0),
+                    (-depth, width_deg - offset),
+                    (0, width_deg - offset),
+                    (0, 0)
+                )
+
+def ring_area_m2(coords):
+    """Area in m² of a lon/lat ring on a spherical Earth"""
+    lon, lat = np.radians(np.asarray(coords, dtype=np.float64)).T
+    # Spherical shoelace: one term per edge, good anywhere on the globe at parking-lot scale
+    edge_sum = np.sum((np.roll(lon, -1) - lon) * (2 + np.sin(lat) + np.sin(np.roll(lat, -1))))
+    return abs(edge_sum) * EARTH_RADIUS_M ** 2 / 2
+
+# Area and capacity estimate for a drawn lot. Cached on its inputs, so reruns from unrelated
+# widgets skip the recomputation (and its log lines)
+@st.cache_data(show_spinner=False, max_entries=64)
+def estimate_capacity(coords, calculation_method, area_per_space, efficiency,
+                      space_width, space_length, aisle_width, num_levels, structure_type):
+    area_m2 = ring_area_m2(coords)
+    
+    add_app_log(f"Calculated area: {area_m2:,.1f} m²", "INFO")
+    
+    space_area = space_width * space_length
+    
+    if calculation_method == "Area per Space (ITE Standard)":
+        estimated_spaces_per_level = int(area_m2 / area_per_space)
+        calc_method_stored = "Area per Space (ITE Standard)"
+        area_per_space_stored = area_per_space
+    else:
+        estimated_spaces_per_level = int((area_m2 * efficiency) / space_area)
+        calc_method_stored = "Efficiency Factor"
+        area_per_space_stored = area_m2 / estimated_spaces_per_level if estimated_spaces_per_level > 0 else space_area / efficiency
+    
+    estimated_spaces = estimated_spaces_per_level * num_levels
+    
+    add_app_log(f"Estimated parking spaces: {estimated_spaces} ({estimated_spaces_per_level}/level × {num_levels} levels)", "INFO")
+    
+    return {
+        'area_m2': area_m2,
+        'space_area': space_area,
+        'estimated_spaces': estimated_spaces,
+        'estimated_spaces_per_level': estimated_spaces_per_level,
+        'num_levels': num_levels,
+        'efficiency': efficiency,
+        'space_width': space_width,
+        'space_length': space_length,
+        'aisle_width': aisle_width,
+        'calculation_method': calc_method_stored,
+        'area_per_space': area_per_space_stored,
+        'structure_type': structure_type
+    }
+
+def level_color(structure_type, level):
+    """RGBA color for a structure level"""
+    colors = UNDERGROUND_LEVEL_COLORS if structure_type == "Underground Parking (3D)" else ABOVEGROUND_LEVEL_COLORS
+    return colors[min(level, len(colors) - 1)]
+
+# Building the deck is O(levels x spaces); cache the rendered HTML per layout and view settings
+@st.cache_data(show_spinner=False, max_entries=32)
+def build_deck_html(space_corners, polygon_coords, num_levels, structure_type, view_style, focused_level_num, floor_height):
+    """Return the 3D structure view as standalone deck.gl HTML"""
+    import pydeck as pdk  # Deferred: only needed for the 3D view
+    
+    all_spaces_3d = []
+    outline_paths = []
+    
+    total_spaces = len(space_corners) * num_levels
+    heavy_scene = total_spaces > HEAVY_SCENE_SPACES
+    draw_outlines = heavy_scene and total_spaces <= MAX_OUTLINED_SPACES
+    
+    poly_arr = np.asarray(polygon_coords, dtype=np.float64)
+    center_lon, center_lat = poly_arr.mean(axis=0).tolist()
+    lon_range, lat_range = (poly_arr.max(axis=0) - poly_arr.min(axis=0)).tolist()
+    max_range = max(lat_range, lon_range)
+    
+    for level in range(num_levels):
+        if structure_type == "Underground Parking (3D)":
+            elevation = -floor_height * (level + 1)
+            level_name = f"B{level + 1}"
+        else:
+            elevation = floor_height * level
+            level_name = f"Level {level + 1}"
+        
+        base_color = level_color(structure_type, level)
+        
+        if view_style == "Exploded (Focus Mode)" and focused_level_num is not None:
+            if level == focused_level_num:
+                color = base_color
+            else:
+                color = [base_color[0], base_color[1], base_color[2], 40]
+        else:
+            color = base_color
+        
+        if view_style in ["Exploded (All Levels)", "Exploded (Focus Mode)"]:
+            offset_multiplier = 1.5
+            horizontal_offset_lon = (level - num_levels/2) * max_range * offset_multiplier
+            horizontal_offset_lat = 0
+        else:
+            horizontal_offset_lon = 0
+            horizontal_offset_lat = 0
+        
+        # Only the fields the layer and tooltip read; ~1 cm precision keeps the JSON small
+        level_xy = np.round(space_corners + (horizontal_offset_lon, horizontal_offset_lat), 7)
+        all_spaces_3d.extend(
+            {
+                'polygon': corners,
+                'elevation': elevation,
+                'color': color,
+                'level': level_name,
+                'space_id': f"{level_name}-{idx+1}",
+            }
+            for idx, corners in enumerate(level_xy.tolist())
+        )
+        
+        if draw_outlines:
+            # Closed ring around the top face of each extruded space
+            rings = np.concatenate([level_xy, level_xy[:, :1]], axis=1)
+            rings = np.concatenate([rings, np.full(rings.shape[:2] + (1,), elevation)], axis=2)
+            outline_paths.extend({'path': path} for path in rings.tolist())
+    
+    # Picking costs an extra render pass per frame, so hover tooltips are limited to smaller structures
+    pickable = total_spaces < MAX_PICKABLE_SPACES
+    
+    layers = []
+    
+    # SolidPolygonLayer skips PolygonLayer's stroke tessellation; small scenes keep the
+    # per-face wireframe and hover highlight, which are too costly for large ones
+    polygon_layer = pdk.Layer(
+        "SolidPolygonLayer",
+        all_spaces_3d,
+        get_polygon="polygon",
+        get_elevation="elevation",
+        elevation_scale=1,
+        extruded=True,
+        get_fill_color="color",
+        get_line_color=[255, 255, 255, 255],
+        pickable=pickable,
+        wireframe=not heavy_scene,
+        auto_highlight=not heavy_scene,
+        material=True,
+        filled=True,
+    )
+    layers.append(polygon_layer)
+    
+    if outline_paths:
+        layers.append(pdk.Layer(
+            "PathLayer",
+            outline_paths,
+            get_path="path",
+            get_color=[255, 255, 255, 255],
+            get_width=1,
+            width_units="pixels",
+        ))
+    
+    if view_style in ["Exploded (All Levels)", "Exploded (Focus Mode)"]:
+        zoom_level = 17
+    else:
+        zoom_level = 18
+    
+    view_state = pdk.ViewState(
+        latitude=center_lat,
+        longitude=center_lon,
+        zoom=zoom_level,
+        pitch=45,
+        bearing=0,
+    )
+    
+    deck = pdk.Deck(
+        layers=layers,
+        initial_view_state=view_state,
+        map_style="satellite",
+        tooltip={
+            "html": "<b>Level:</b> {level}<br/><b>Elevation:</b> {elevation}m<br/><b>Space:</b> {space_id}",
+            "style": {
+                "backgroundColor": "steelblue",
+                "color": "white",
+                "fontSize": "14px",
+                "padding": "10px"
+            }
+        } if pickable else False,
+    )
+    
+    return deck.to_html(as_string=True)
 
 # Sidebar for parameters
 st.sidebar.header("Parking Configuration")
@@ -187,13 +705,14 @@ unit_system = st.sidebar.radio(
     "Unit System",
     ["Imperial", "Metric"],
     horizontal=True,
-    help="Choose between metric (meters) or imperial (feet) measurements"
+    help="Choose between metric (meters) or imperial (feet) measurements",
+    key="unit_system"
 )
 
 # Conversion factors
 if unit_system == "Imperial":
-    length_conversion = 3.28084
-    area_conversion = 10.764
+    length_conversion = FEET_PER_METER
+    area_conversion = SQFT_PER_SQM
     length_unit = "ft"
     area_unit = "sf"
 else:
@@ -202,67 +721,89 @@ else:
     length_unit = "m"
     area_unit = "m²"
 
-st.sidebar.markdown("---")
-
-# Basemap selection
-basemap_options = [
-    "Esri World Imagery",
-    "Google Satellite",
-    "Esri Clarity (High-Res)",
-]
+def length_input(label, spec, container=st):
+    """Length number_input shown in the selected unit system; returns meters"""
+    return container.number_input(f"{label} ({length_unit})", **spec) / length_conversion
 
-if st.session_state.naip_available:
-    basemap_options.insert(3, "USDA NAIP (via Esri)")
-else:
-    st.sidebar.warning("⚠️ USDA NAIP imagery currently unavailable")
+st.sidebar.markdown("---")
 
-basemap = st.sidebar.selectbox("Basemap Layer", basemap_options)
+def set_naip_available(available):
+    """Record a NAIP check result for this session"""
+    st.session_state.naip_available = available
+    st.session_state.naip_checked_at = time.monotonic()
 
-if not st.session_state.naip_available:
-    if st.sidebar.button("🔄 Test NAIP Connection"):
-        with st.spinner("Testing NAIP endpoint..."):
-            st.session_state.naip_available = test_naip_availability()
-            if st.session_state.naip_available:
-                st.sidebar.success("✓ NAIP is now available!")
-                st.rerun()
-            else:
-                st.sidebar.error("✗ NAIP still unavailable")
+# A failed NAIP check is only trusted for a while; then NAIP is offered again and
+# re-verified when selected (by which time the cached probe has expired too)
+if not st.session_state.naip_available and time.monotonic() - st.session_state.naip_checked_at > NAIP_RECHECK_SECONDS:
+    st.session_state.naip_available = True
 
-if st.sidebar.button("🔄 Test All Basemaps"):
-    with st.spinner("Testing all endpoints..."):
-        st.session_state.basemap_status = test_all_basemaps()
-        st.session_state.naip_available = test_naip_availability()
+# Basemap selection
+basemap_options = BASEMAP_OPTIONS_BASE
+if st.session_state.naip_available:
+    basemap_options += ("USDA NAIP (via Esri)",)
+basemap_options += ("OpenStreetMap",)
+
+basemap = st.sidebar.selectbox("Basemap Layer", basemap_options, key="basemap")
+
+# Endpoints are not probed on startup; NAIP is verified only once it is actually selected
+if basemap == "USDA NAIP (via Esri)":
+    with st.spinner("Checking NAIP availability..."):
+        if not test_naip_availability():
+            set_naip_available(False)
+            st.rerun()
+
+# Runs as a fragment (streamlit>=1.37) so connectivity tests only rerun this panel, not the map and layout below
+@st.fragment
+def connectivity_panel():
+    """Sidebar panel with on-demand endpoint tests and the resulting status"""
+    with st.expander("🔌 Connectivity"):
+        if not st.session_state.naip_available:
+            if st.button("🔄 Test NAIP Connection"):
+                with st.spinner("Testing NAIP endpoint..."):
+                    test_naip_availability.clear()
+                    set_naip_available(test_naip_availability())
+                    if st.session_state.naip_available:
+                        st.success("✓ NAIP is now available!")
+                        st.rerun()
+                    else:
+                        st.error("✗ NAIP still unavailable")
         
-        all_working = all(st.session_state.basemap_status.values())
-        if all_working and st.session_state.naip_available:
-            st.sidebar.success("✓ All basemaps available!")
-        else:
-            failed = [name for name, status in st.session_state.basemap_status.items() if not status]
-            if not st.session_state.naip_available:
-                failed.append("NAIP")
-            st.sidebar.warning(f"⚠️ Issues with: {', '.join(failed)}")
-
-if 'basemap_status' in st.session_state:
-    failed_basemaps = [name for name, status in st.session_state.basemap_status.items() if not status]
-    if failed_basemaps:
-        st.sidebar.warning(f"⚠️ Currently unavailable: {', '.join(failed_basemaps)}")
-
-basemap_options.append("OpenStreetMap")
+        if st.button("🔄 Test All Basemaps"):
+            with st.spinner("Testing all endpoints..."):
+                naip_was_available = st.session_state.naip_available
+                clear_endpoint_cache()
+                naip_available, st.session_state.basemap_status = run_endpoint_checks()
+                set_naip_available(naip_available)
+                
+                # The basemap list depends on NAIP, so a change there needs a full rerun
+                if st.session_state.naip_available != naip_was_available:
+                    st.rerun()
+                
+                all_working = all(st.session_state.basemap_status.values())
+                if all_working and st.session_state.naip_available:
+                    st.success("✓ All basemaps available!")
+                else:
+                    failed = [name for name, status in st.session_state.basemap_status.items() if not status]
+                    if not st.session_state.naip_available:
+                        failed.append("NAIP")
+                    st.warning(f"⚠️ Issues with: {', '.join(failed)}")
+    
+    # One combined status line instead of separate NAIP / basemap warnings
+    unavailable = [name for name, status in st.session_state.basemap_status.items() if not status]
+    if not st.session_state.naip_available:
+        unavailable.insert(0, "USDA NAIP imagery")
+    if unavailable:
+        st.warning(f"⚠️ Currently unavailable: {', '.join(unavailable)}")
 
-# Basemap information
-basemap_info = {
-    "Esri World Imagery": "**Update Frequency:** Quarterly to annually\n\n**Resolution:** 30cm-1m in urban areas\n\n**Coverage:** Global",
-    "Google Satellite": "**Update Frequency:** Monthly to annually\n\n**Resolution:** 15cm-1m\n\n**Coverage:** Global",
-    "Esri Clarity (High-Res)": "**Update Frequency:** Annually\n\n**Resolution:** 30-50cm\n\n**Coverage:** Global",
-    "USDA NAIP (via Esri)": "**Update Frequency:** Every 2-3 years\n\n**Resolution:** 60cm-1m\n\n**Coverage:** Continental US only",
-    "OpenStreetMap": "**Update Frequency:** Real-time\n\n**Resolution:** Vector data\n\n**Coverage:** Global"
-}
+with st.sidebar:
+    connectivity_panel()
 
-st.sidebar.info(basemap_info[basemap])
+st.sidebar.info(BASEMAP_INFO[basemap])
 
 parking_type = st.sidebar.selectbox(
     "Parking Type",
-    ["Standard Perpendicular (90°)", "Angled (45°)", "Parallel", "Compact"]
+    ["Standard Perpendicular (90°)", "Angled (45°)", "Parallel", "Compact"],
+    key="parking_type"
 )
 
 layout_orientation = st.sidebar.selectbox(
@@ -273,7 +814,8 @@ layout_orientation = st.sidebar.selectbox(
         "Column-Based (Vertical)",
         "Perimeter + Center (High Efficiency)"
     ],
-    help="Choose parking layout style"
+    help="Choose parking layout style",
+    key="layout_orientation"
 )
 
 # Configuration for Perimeter + Center layout
@@ -295,25 +837,20 @@ if layout_orientation == "Perimeter + Center (High Efficiency)":
         required_corner_size = 36.1
     
     if unit_system == "Imperial":
-        corner_island_size_display = st.sidebar.number_input(
-            f"Corner Island Size ({length_unit})",
-            min_value=10.0,
-            max_value=80.0,  # Increased max
-            value=required_corner_size,  # Dynamic default!
-            step=5.0,
-            help=f"Recommended: {required_corner_size:.0f}ft for current settings"
-        )
-        corner_island_size = corner_island_size_display / length_conversion
+        recommended_corner_size = f"{required_corner_size:.0f}"
     else:
-        required_corner_size_m = required_corner_size / 3.28084
-        corner_island_size = st.sidebar.number_input(
-            f"Corner Island Size ({length_unit})",
-            min_value=3.0,
-            max_value=24.0,  # Increased max
-            value=required_corner_size_m,
-            step=1.0,
-            help=f"Recommended: {required_corner_size_m:.1f}m for current settings"
-        )
+        required_corner_size = required_corner_size / FEET_PER_METER
+        recommended_corner_size = f"{required_corner_size:.1f}"
+    
+    corner_island_size = length_input(
+        "Corner Island Size",
+        dict(
+            CORNER_ISLAND_INPUTS[unit_system],
+            value=required_corner_size,  # Dynamic default!
+            help=f"Recommended: {recommended_corner_size}{length_unit} for current settings"
+        ),
+        container=st.sidebar
+    )
     
     center_aisle_count = st.sidebar.slider(
         "Center Parking Rows",
@@ -327,69 +864,19 @@ if layout_orientation == "Perimeter + Center (High Efficiency)":
 structure_type = st.sidebar.selectbox(
     "Structure Type",
     ["Surface Lot (2D)", "Parking Structure (3D)", "Underground Parking (3D)"],
-    help="Choose surface lot for traditional 2D view, or structure/underground for multi-level 3D analysis"
+    help="Choose surface lot for traditional 2D view, or structure/underground for multi-level 3D analysis",
+    key="structure_type"
 )
 
 # Multi-level settings for 3D structures
 if structure_type != "Surface Lot (2D)":
     st.sidebar.markdown("### 🏢 Multi-Level Settings")
     
-    if structure_type == "Parking Structure (3D)":
-        num_levels = st.sidebar.number_input(
-            "Number of Levels",
-            min_value=1,
-            max_value=10,
-            value=3,
-            help="Number of parking levels in the structure"
-        )
-        if unit_system == "Imperial":
-            floor_height_display = st.sidebar.number_input(
-                f"Floor Height ({length_unit})",
-                min_value=8.0,
-                max_value=16.0,
-                value=11.5,
-                step=0.5,
-                help="Height between floors"
-            )
-            floor_height = floor_height_display / length_conversion
-        else:
-            floor_height = st.sidebar.number_input(
-                f"Floor Height ({length_unit})",
-                min_value=2.5,
-                max_value=5.0,
-                value=3.5,
-                step=0.5,
-                help="Height between floors"
-            )
-        ground_level = 0
-    else:  # Underground
-        num_levels = st.sidebar.number_input(
-            "Number of Underground Levels",
-            min_value=1,
-            max_value=5,
-            value=2,
-            help="Number of underground parking levels"
-        )
-        if unit_system == "Imperial":
-            floor_height_display = st.sidebar.number_input(
-                f"Floor Height ({length_unit})",
-                min_value=8.0,
-                max_value=13.0,
-                value=10.0,
-                step=0.5,
-                help="Height between underground floors"
-            )
-            floor_height = floor_height_display / length_conversion
-        else:
-            floor_height = st.sidebar.number_input(
-                f"Floor Height ({length_unit})",
-                min_value=2.5,
-                max_value=4.0,
-                value=3.0,
-                step=0.5,
-                help="Height between underground floors"
-            )
-        ground_level = 0
+    num_levels_label, num_levels_spec = NUM_LEVELS_INPUTS[structure_type]
+    num_levels = st.sidebar.number_input(num_levels_label, **num_levels_spec)
+    
+    floor_height = length_input("Floor Height", FLOOR_HEIGHT_DEFAULTS[(structure_type, unit_system)], container=st.sidebar)
+    ground_level = 0
 else:
     num_levels = 1
     floor_height = 0
@@ -399,71 +886,24 @@ else:
 calculation_method = st.sidebar.radio(
     "Calculation Method",
     ["Area per Space (ITE Standard)", "Efficiency Factor"],  # ← SWAPPED ORDER
-    help="Choose between industry-standard area per space or efficiency factor method"
+    help="Choose between industry-standard area per space or efficiency factor method",
+    key="calculation_method"
 )
 
 st.sidebar.markdown("---")
 
 with st.sidebar.expander("🅿️ Space Settings", expanded=True):
+    defaults = PARKING_DEFAULTS[(parking_type, unit_system)]
+    space_width = length_input("Space Width", defaults['space_width'])
+    space_length = length_input("Space Length", defaults['space_length'])
+    aisle_width = length_input("Aisle Width", defaults['aisle_width'])
+    
     if calculation_method == "Efficiency Factor":
-        if parking_type == "Standard Perpendicular (90°)":
-            if unit_system == "Imperial":
-                space_width_display = st.number_input(f"Space Width ({length_unit})", value=8.2, min_value=6.5, max_value=11.5, step=0.5)
-                space_length_display = st.number_input(f"Space Length ({length_unit})", value=16.4, min_value=14.8, max_value=19.7, step=0.5)
-                aisle_width_display = st.number_input(f"Aisle Width ({length_unit})", value=19.7, min_value=16.4, max_value=26.2, step=1.0)
-                space_width = space_width_display / length_conversion
-                space_length = space_length_display / length_conversion
-                aisle_width = aisle_width_display / length_conversion
-            else:
-                space_width = st.number_input(f"Space Width ({length_unit})", value=2.5, min_value=2.0, max_value=3.5, step=0.1)
-                space_length = st.number_input(f"Space Length ({length_unit})", value=5.0, min_value=4.5, max_value=6.0, step=0.1)
-                aisle_width = st.number_input(f"Aisle Width ({length_unit})", value=6.0, min_value=5.0, max_value=8.0, step=0.5)
-            default_efficiency = 0.85
-        elif parking_type == "Angled (45°)":
-            if unit_system == "Imperial":
-                space_width_display = st.number_input(f"Space Width ({length_unit})", value=8.2, min_value=6.5, max_value=11.5, step=0.5)
-                space_length_display = st.number_input(f"Space Length ({length_unit})", value=18.0, min_value=16.4, max_value=21.3, step=0.5)
-                aisle_width_display = st.number_input(f"Aisle Width ({length_unit})", value=13.1, min_value=11.5, max_value=19.7, step=1.0)
-                space_width = space_width_display / length_conversion
-                space_length = space_length_display / length_conversion
-                aisle_width = aisle_width_display / length_conversion
-            else:
-                space_width = st.number_input(f"Space Width ({length_unit})", value=2.5, min_value=2.0, max_value=3.5, step=0.1)
-                space_length = st.number_input(f"Space Length ({length_unit})", value=5.5, min_value=5.0, max_value=6.5, step=0.1)
-                aisle_width = st.number_input(f"Aisle Width ({length_unit})", value=4.0, min_value=3.5, max_value=6.0, step=0.5)
-            default_efficiency = 0.80
-        elif parking_type == "Parallel":
-            if unit_system == "Imperial":
-                space_width_display = st.number_input(f"Space Width ({length_unit})", value=8.2, min_value=6.5, max_value=9.8, step=0.5)
-                space_length_display = st.number_input(f"Space Length ({length_unit})", value=21.3, min_value=19.7, max_value=26.2, step=0.5)
-                aisle_width_display = st.number_input(f"Aisle Width ({length_unit})", value=11.5, min_value=9.8, max_value=16.4, step=1.0)
-                space_width = space_width_display / length_conversion
-                space_length = space_length_display / length_conversion
-                aisle_width = aisle_width_display / length_conversion
-            else:
-                space_width = st.number_input(f"Space Width ({length_unit})", value=2.5, min_value=2.0, max_value=3.0, step=0.1)
-                space_length = st.number_input(f"Space Length ({length_unit})", value=6.5, min_value=6.0, max_value=8.0, step=0.1)
-                aisle_width = st.number_input(f"Aisle Width ({length_unit})", value=3.5, min_value=3.0, max_value=5.0, step=0.5)
-            default_efficiency = 0.65
-        else:  # Compact
-            if unit_system == "Imperial":
-                space_width_display = st.number_input(f"Space Width ({length_unit})", value=7.5, min_value=6.5, max_value=9.2, step=0.5)
-                space_length_display = st.number_input(f"Space Length ({length_unit})", value=14.8, min_value=13.1, max_value=18.0, step=0.5)
-                aisle_width_display = st.number_input(f"Aisle Width ({length_unit})", value=18.0, min_value=16.4, max_value=23.0, step=1.0)
-                space_width = space_width_display / length_conversion
-                space_length = space_length_display / length_conversion
-                aisle_width = aisle_width_display / length_conversion
-            else:
-                space_width = st.number_input(f"Space Width ({length_unit})", value=2.3, min_value=2.0, max_value=2.8, step=0.1)
-                space_length = st.number_input(f"Space Length ({length_unit})", value=4.5, min_value=4.0, max_value=5.5, step=0.1)
-                aisle_width = st.number_input(f"Aisle Width ({length_unit})", value=5.5, min_value=5.0, max_value=7.0, step=0.5)
-            default_efficiency = 0.87
-        
         efficiency = st.slider(
             "Efficiency Factor",
             min_value=0.50,
             max_value=0.95,
-            value=default_efficiency,
+            value=defaults['efficiency'],
             step=0.05,
             help="Accounts for circulation, landscaping, and access"
         )
@@ -471,62 +911,7 @@ with st.sidebar.expander("🅿️ Space Settings", expanded=True):
         st.info(f"**Efficiency Factor:** {efficiency*100}%\n\n⚠️ Practical estimates accounting for aisles, access routes, and pedestrian areas")
 
     else:  # Area per Space method
-        if parking_type == "Standard Perpendicular (90°)":
-            if unit_system == "Imperial":
-                space_width_display = st.number_input(f"Space Width ({length_unit})", value=8.2, min_value=6.5, max_value=11.5, step=0.5)
-                space_length_display = st.number_input(f"Space Length ({length_unit})", value=16.4, min_value=14.8, max_value=19.7, step=0.5)
-                aisle_width_display = st.number_input(f"Aisle Width ({length_unit})", value=19.7, min_value=16.4, max_value=26.2, step=1.0)
-                space_width = space_width_display / length_conversion
-                space_length = space_length_display / length_conversion
-                aisle_width = aisle_width_display / length_conversion
-                default_area_per_space = 400
-            else:
-                space_width = st.number_input(f"Space Width ({length_unit})", value=2.5, min_value=2.0, max_value=3.5, step=0.1)
-                space_length = st.number_input(f"Space Length ({length_unit})", value=5.0, min_value=4.5, max_value=6.0, step=0.1)
-                aisle_width = st.number_input(f"Aisle Width ({length_unit})", value=6.0, min_value=5.0, max_value=8.0, step=0.5)
-                default_area_per_space = 37.2
-        elif parking_type == "Angled (45°)":
-            if unit_system == "Imperial":
-                space_width_display = st.number_input(f"Space Width ({length_unit})", value=8.2, min_value=6.5, max_value=11.5, step=0.5)
-                space_length_display = st.number_input(f"Space Length ({length_unit})", value=18.0, min_value=16.4, max_value=21.3, step=0.5)
-                aisle_width_display = st.number_input(f"Aisle Width ({length_unit})", value=13.1, min_value=11.5, max_value=19.7, step=1.0)
-                space_width = space_width_display / length_conversion
-                space_length = space_length_display / length_conversion
-                aisle_width = aisle_width_display / length_conversion
-                default_area_per_space = 450
-            else:
-                space_width = st.number_input(f"Space Width ({length_unit})", value=2.5, min_value=2.0, max_value=3.5, step=0.1)
-                space_length = st.number_input(f"Space Length ({length_unit})", value=5.5, min_value=5.0, max_value=6.5, step=0.1)
-                aisle_width = st.number_input(f"Aisle Width ({length_unit})", value=4.0, min_value=3.5, max_value=6.0, step=0.5)
-                default_area_per_space = 41.8
-        elif parking_type == "Parallel":
-            if unit_system == "Imperial":
-                space_width_display = st.number_input(f"Space Width ({length_unit})", value=8.2, min_value=6.5, max_value=9.8, step=0.5)
-                space_length_display = st.number_input(f"Space Length ({length_unit})", value=21.3, min_value=19.7, max_value=26.2, step=0.5)
-                aisle_width_display = st.number_input(f"Aisle Width ({length_unit})", value=11.5, min_value=9.8, max_value=16.4, step=1.0)
-                space_width = space_width_display / length_conversion
-                space_length = space_length_display / length_conversion
-                aisle_width = aisle_width_display / length_conversion
-                default_area_per_space = 550
-            else:
-                space_width = st.number_input(f"Space Width ({length_unit})", value=2.5, min_value=2.0, max_value=3.0, step=0.1)
-                space_length = st.number_input(f"Space Length ({length_unit})", value=6.5, min_value=6.0, max_value=8.0, step=0.1)
-                aisle_width = st.number_input(f"Aisle Width ({length_unit})", value=3.5, min_value=3.0, max_value=5.0, step=0.5)
-                default_area_per_space = 51.1
-        else:  # Compact
-            if unit_system == "Imperial":
-                space_width_display = st.number_input(f"Space Width ({length_unit})", value=7.5, min_value=6.5, max_value=9.2, step=0.5)
-                space_length_display = st.number_input(f"Space Length ({length_unit})", value=14.8, min_value=13.1, max_value=18.0, step=0.5)
-                aisle_width_display = st.number_input(f"Aisle Width ({length_unit})", value=18.0, min_value=16.4, max_value=23.0, step=1.0)
-                space_width = space_width_display / length_conversion
-                space_length = space_length_display / length_conversion
-                aisle_width = aisle_width_display / length_conversion
-                default_area_per_space = 350
-            else:
-                space_width = st.number_input(f"Space Width ({length_unit})", value=2.3, min_value=2.0, max_value=2.8, step=0.1)
-                space_length = st.number_input(f"Space Length ({length_unit})", value=4.5, min_value=4.0, max_value=5.5, step=0.1)
-                aisle_width = st.number_input(f"Aisle Width ({length_unit})", value=5.5, min_value=5.0, max_value=7.0, step=0.5)
-                default_area_per_space = 32.5
+        default_area_per_space = defaults['area_per_space']
         
         if unit_system == "Imperial":
             area_per_space_display = st.number_input(
@@ -591,49 +976,35 @@ with search_col2:
 
 if search_button and address:
     try:
-        encoded_address = urllib.parse.quote(address)
-        url = f"https://nominatim.openstreetmap.org/search?q={encoded_address}&format=json&limit=1"
+        # Normalize case and spacing so trivially different spellings share one cached lookup
+        result = geocode(" ".join(address.lower().split()))
         
-        logging.info(f"Geocoding request for address: {address}")
-        add_app_log(f"Geocoding address: {address}", "INFO")
-        
-        response = requests.get(
-            url, 
-            verify=False,
-            headers={'User-Agent': 'parking_estimator_app_v1'},
-            timeout=10
-        )
-        
-        urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-        
-        if response.status_code == 200:
-            results = response.json()
-            if results:
-                location = results[0]
-                st.session_state.map_center = [float(location['lat']), float(location['lon'])]
-                st.session_state.map_zoom = 18
-                st.success(f"✓ Found: {location.get('display_name', address)}")
-                logging.info(f"Geocoding SUCCESS - Found: {location.get('display_name', address)}")
-                add_app_log(f"Geocoding SUCCESS - Found location", "INFO")
-            else:
-                st.error("Address not found. Please try a different search term.")
-                logging.warning(f"Geocoding returned no results for: {address}")
-                add_app_log(f"Geocoding returned no results", "WARNING")
+        if result:
+            lat, lon, display_name = result
+            st.session_state.map_center = [lat, lon]
+            st.session_state.map_zoom = 18
+            st.success(f"✓ Found: {display_name}")
+            logger.info(f"Geocoding SUCCESS - Found: {display_name}")
+            add_app_log(f"Geocoding SUCCESS - Found location", "INFO")
         else:
-            st.error(f"Search failed with status code: {response.status_code}")
-            logging.error(f"Geocoding FAILED - Status: {response.status_code}, Response: {response.text[:200]}")
-            add_app_log(f"Geocoding FAILED - Status: {response.status_code}", "ERROR")
+            st.error("Address not found. Please try a different search term.")
+            logger.warning(f"Geocoding returned no results for: {address}")
+            add_app_log(f"Geocoding returned no results", "WARNING")
+    except requests.exceptions.HTTPError as e:
+        st.error(f"Search failed with status code: {e.response.status_code}")
+        logger.error(f"Geocoding FAILED - Status: {e.response.status_code}, Response: {e.response.text[:200]}")
+        add_app_log(f"Geocoding FAILED - Status: {e.response.status_code}", "ERROR")
     except requests.exceptions.Timeout as e:
         st.error("Search timed out. Please try again.")
-        logging.error(f"Geocoding TIMEOUT - {str(e)}")
+        logger.error(f"Geocoding TIMEOUT - {str(e)}")
         add_app_log(f"Geocoding TIMEOUT", "ERROR")
     except requests.exceptions.ConnectionError as e:
         st.error("Connection error. Please check your network.")
-        logging.error(f"Geocoding CONNECTION ERROR - {str(e)}")
+        logger.error(f"Geocoding CONNECTION ERROR - {str(e)}")
         add_app_log(f"Geocoding CONNECTION ERROR", "ERROR")
     except Exception as e:
         st.error(f"Search error: {str(e)}")
-        logging.error(f"Geocoding UNKNOWN ERROR - {type(e).__name__}: {str(e)}")
+        logger.error(f"Geocoding UNKNOWN ERROR - {type(e).__name__}: {str(e)}")
         add_app_log(f"Geocoding ERROR: {type(e).__name__}", "ERROR")
 
 st.markdown("---")
@@ -672,189 +1043,48 @@ with col1:
             
             if view_style == "Exploded (Focus Mode)":
                 with col_3d2:
-                    if structure_type == "Underground Parking (3D)":
-                        level_options = [f"B{i+1}" for i in range(num_levels)]
-                    else:
-                        level_options = [f"Level {i+1}" for i in range(num_levels)]
-                    
-                    focused_level = st.selectbox(
+                    focused_level_num = st.selectbox(
                         "Focus on Level",
-                        level_options,
+                        list(range(num_levels)),
+                        format_func=lambda level: f"B{level + 1}" if structure_type == "Underground Parking (3D)" else f"Level {level + 1}",
                         help="Selected level will be solid, others transparent"
                     )
-                    if "B" in focused_level:
-                        focused_level_num = int(focused_level.replace("B", "")) - 1
-                    else:
-                        focused_level_num = int(focused_level.replace("Level ", "")) - 1
             else:
                 focused_level_num = None
             
-            if 'parking_spaces_3d' in st.session_state:
-                all_spaces_3d = []
-                
-                lats = [coord[1] for coord in polygon_coords]
-                lons = [coord[0] for coord in polygon_coords]
-                center_lat = sum(lats) / len(lats)
-                center_lon = sum(lons) / len(lons)
-                
-                lat_range = max(lats) - min(lats)
-                lon_range = max(lons) - min(lons)
-                max_range = max(lat_range, lon_range)
-                
-                for level in range(num_levels):
-                    if structure_type == "Underground Parking (3D)":
-                        elevation = -floor_height * (level + 1)
-                        level_name = f"B{level + 1}"
-                    else:
-                        elevation = floor_height * level
-                        level_name = f"Level {level + 1}"
-                    
-                    if structure_type == "Underground Parking (3D)":
-                        underground_colors = [
-                            [0, 150, 255, 230],
-                            [0, 200, 255, 230],
-                            [100, 220, 255, 230],
-                            [150, 240, 255, 230],
-                            [200, 250, 255, 230],
-                        ]
-                        base_color = underground_colors[min(level, 4)]
-                    else:
-                        aboveground_colors = [
-                            [0, 200, 0, 230],
-                            [255, 230, 0, 230],
-                            [255, 165, 0, 230],
-                            [255, 50, 50, 230],
-                            [200, 0, 255, 230],
-                            [255, 20, 147, 230],
-                            [0, 255, 255, 230],
-                            [255, 100, 0, 230],
-                            [220, 100, 255, 230],
-                            [50, 255, 150, 230],
-                        ]
-                        base_color = aboveground_colors[min(level, 9)]
-                    
-                    if view_style == "Exploded (Focus Mode)" and focused_level_num is not None:
-                        if level == focused_level_num:
-                            color = base_color
-                        else:
-                            color = [base_color[0], base_color[1], base_color[2], 40]
-                    else:
-                        color = base_color
-                    
-                    if view_style in ["Exploded (All Levels)", "Exploded (Focus Mode)"]:
-                        offset_multiplier = 1.5
-                        horizontal_offset_lon = (level - num_levels/2) * max_range * offset_multiplier
-                        horizontal_offset_lat = 0
-                    else:
-                        horizontal_offset_lon = 0
-                        horizontal_offset_lat = 0
-                    
-                    for idx, space in enumerate(st.session_state.parking_spaces_3d):
-                        offset_coords = [
-                            (coord[0] + horizontal_offset_lon, coord[1] + horizontal_offset_lat) 
-                            for coord in space['coords']
-                        ]
-                        
-                        space_3d = {
-                            'polygon': offset_coords,
-                            'elevation': elevation,
-                            'height': 2.5,
-                            'color': color,
-                            'level': level_name,
-                            'space_id': f"{level_name}-{idx+1}",
-                            'level_number': level + 1
-                        }
-                        all_spaces_3d.append(space_3d)
-                
-                layers = []
-                
-                polygon_layer = pdk.Layer(
-                    "PolygonLayer",
-                    all_spaces_3d,
-                    get_polygon="polygon",
-                    get_elevation="elevation",
-                    elevation_scale=1,
-                    extruded=True,
-                    get_fill_color="color",
-                    get_line_color=[255, 255, 255, 255],
-                    line_width_min_pixels=2,
-                    pickable=True,
-                    wireframe=True,
-                    auto_highlight=True,
-                    get_elevation_weight="height",
-                    material=True,
-                    filled=True,
-                )
-                layers.append(polygon_layer)
-                
-                if view_style in ["Exploded (All Levels)", "Exploded (Focus Mode)"]:
-                    zoom_level = 17
-                else:
-                    zoom_level = 18
-                
-                view_state = pdk.ViewState(
-                    latitude=center_lat,
-                    longitude=center_lon,
-                    zoom=zoom_level,
-                    pitch=45,
-                    bearing=0,
-                )
-                
-                deck = pdk.Deck(
-                    layers=layers,
-                    initial_view_state=view_state,
-                    map_style="satellite",
-                    tooltip={
-                        "html": "<b>Level:</b> {level}<br/><b>Elevation:</b> {elevation}m<br/><b>Space:</b> {space_id}",
-                        "style": {
-                            "backgroundColor": "steelblue",
-                            "color": "white",
-                            "fontSize": "14px",
-                            "padding": "10px"
-                        }
-                    },
+            if st.session_state.get('parking_spaces_3d_array') is not None:
+                deck_html = build_deck_html(
+                    st.session_state.parking_spaces_3d_array, polygon_coords, num_levels, structure_type,
+                    view_style, focused_level_num, floor_height
                 )
                 
-                st.pydeck_chart(deck, use_container_width=True, height=600)
+                # Static HTML embed: the deck is rendered client-side instead of being re-synced
+                # through the widget protocol on every rerun; tooltips still work inside the iframe
+                components.html(deck_html, height=600)
+                if len(st.session_state.parking_spaces_3d_array) * num_levels >= MAX_PICKABLE_SPACES:
+                    st.caption("Hover tooltips are disabled at this scale for performance")
                 
                 st.markdown("### Level Legend")
-                legend_cols = st.columns(min(num_levels, 5))
-                
+                # One markdown element for the whole legend, laid out like the old 5-column grid
+                legend_items = []
                 for level in range(num_levels):
                     if structure_type == "Underground Parking (3D)":
                         level_name = f"B{level + 1}"
-                        underground_colors = [
-                            [0, 150, 255],
-                            [0, 200, 255],
-                            [100, 220, 255],
-                            [150, 240, 255],
-                            [200, 250, 255],
-                        ]
-                        color = underground_colors[min(level, 4)]
                     else:
                         level_name = f"Level {level + 1}"
-                        aboveground_colors = [
-                            [0, 200, 0],
-                            [255, 230, 0],
-                            [255, 165, 0],
-                            [255, 50, 50],
-                            [200, 0, 255],
-                            [255, 20, 147],
-                            [0, 255, 255],
-                            [255, 100, 0],
-                            [220, 100, 255],
-                            [50, 255, 150],
-                        ]
-                        color = aboveground_colors[min(level, 9)]
+                    color = level_color(structure_type, level)
                     
-                    col_idx = level % 5
-                    with legend_cols[col_idx]:
-                        st.markdown(
-                            f'<div style="background-color: rgb({color[0]}, {color[1]}, {color[2]}); '
-                            f'padding: 10px; border-radius: 5px; text-align: center; color: white; '
-                            f'font-weight: bold; margin: 5px; border: 2px solid rgba(255,255,255,0.3);">{level_name}</div>',
-                            unsafe_allow_html=True
-                        )
+                    legend_items.append(
+                        f'<div style="background-color: rgb({color[0]}, {color[1]}, {color[2]}); '
+                        f'padding: 10px; border-radius: 5px; text-align: center; color: white; '
+                        f'font-weight: bold; margin: 5px; border: 2px solid rgba(255,255,255,0.3);">{level_name}</div>'
+                    )
+                
+                st.markdown(
+                    f'<div style="display: grid; grid-template-columns: repeat({min(num_levels, 5)}, 1fr);">'
+                    f'{"".join(legend_items)}</div>',
+                    unsafe_allow_html=True
+                )
                 
                 total_spaces_all_levels = st.session_state.actual_spaces_drawn * num_levels
                 st.success(f"🏢 Total Spaces Across {num_levels} Level(s): **{total_spaces_all_levels:,}**")
@@ -865,36 +1095,10 @@ with col1:
     else:
         st.markdown("### 🗺️ 2D Map View" if structure_type != "Surface Lot (2D)" else "")
     
-    basemap_endpoints = {
-        "Esri World Imagery": {
-            'url': 'https://server.arcgisonline.com/ArcGIS/rest/services/World_Imagery/MapServer/tile/{z}/{y}/{x}',
-            'attr': 'Esri'
-        },
-        "Google Satellite": {
-            'url': 'https://mt1.google.com/vt/lyrs=s&x={x}&y={y}&z={z}',
-            'attr': 'Google'
-        },
-        "Esri Clarity (High-Res)": {
-            'url': 'https://clarity.maptiles.arcgis.com/arcgis/rest/services/World_Imagery/MapServer/tile/{z}/{y}/{x}',
-            'attr': 'Esri Clarity'
-        },
-        "USDA NAIP (via Esri)": {
-            'url': 'https://naip.arcgis.com/arcgis/rest/services/NAIP/ImageServer/tile/{z}/{y}/{x}',
-            'attr': 'USDA NAIP'
-        },
-        "OpenStreetMap": {
-            'url': 'OpenStreetMap',
-            'attr': 'OpenStreetMap'
-        }
-    }
-    
-    selected = basemap_endpoints.get(basemap, basemap_endpoints["Esri World Imagery"])
+    selected = BASEMAP_ENDPOINTS.get(basemap, BASEMAP_ENDPOINTS["Esri World Imagery"])
     tiles = selected['url']
     attr = selected['attr']
     
-    logging.info(f"Loading basemap: {basemap}")
-    add_app_log(f"Loading basemap: {basemap}", "INFO")
-    
     if st.session_state.get('polygon_center') and st.session_state.get('show_layout'):
         map_center = st.session_state.polygon_center
         map_zoom = st.session_state.polygon_zoom
@@ -906,6 +1110,15 @@ with col1:
         map_center = st.session_state.map_center
         map_zoom = st.session_state.map_zoom
     
+    # The map is rebuilt every rerun; only log when the basemap or view actually changes
+    basemap_view = (basemap, tuple(map_center), map_zoom)
+    log_basemap = basemap_view != st.session_state.last_basemap_view
+    st.session_state.last_basemap_view = basemap_view
+    
+    if log_basemap:
+        logger.info(f"Loading basemap: {basemap}")
+        add_app_log(f"Loading basemap: {basemap}", "INFO")
+    
     try:
         m = folium.Map(
             location=map_center,
@@ -913,10 +1126,11 @@ with col1:
             tiles=tiles,
             attr=attr
         )
-        logging.info(f"Basemap {basemap} loaded successfully at {map_center}")
-        add_app_log(f"Basemap {basemap} loaded successfully", "INFO")
+        if log_basemap:
+            logger.info(f"Basemap {basemap} loaded successfully at {map_center}")
+            add_app_log(f"Basemap {basemap} loaded successfully", "INFO")
     except Exception as e:
-        logging.error(f"Failed to load basemap {basemap} - {type(e).__name__}: {str(e)}")
+        logger.error(f"Failed to load basemap {basemap} - {type(e).__name__}: {str(e)}")
         add_app_log(f"Failed to load basemap {basemap}", "ERROR")
         map_center = st.session_state.get('polygon_center') or st.session_state.map_center
         map_zoom = st.session_state.get('polygon_zoom') or st.session_state.map_zoom
@@ -930,18 +1144,12 @@ with col1:
         st.warning(f"⚠️ Failed to load {basemap}, using OpenStreetMap instead")
         add_app_log(f"Fallback to OpenStreetMap", "WARNING")
     
+    # A Draw control is bound to the map it's added to, so it's created per map from shared options
     folium.plugins.Draw(
         export=False,
         position='topleft',
-        draw_options={
-            'polyline': False,
-            'rectangle': True,
-            'polygon': True,
-            'circle': False,
-            'marker': False,
-            'circlemarker': False,
-        },
-        edit_options={'edit': True}
+        draw_options=DRAW_OPTIONS,
+        edit_options=DRAW_EDIT_OPTIONS
     ).add_to(m)
     
     # Add parking space layout if requested
@@ -956,6 +1164,13 @@ with col1:
             st.info("📐 **Conservative Layout Mode**: Using industry-standard conservative dimensions (larger spaces, wider aisles, landscaping buffers)")
             add_app_log(f"Conservative layout mode: applying conservative dimensions", "INFO")
             
+            if "Perpendicular" in p_type or "Compact" in p_type:
+                dims_ft = CONSERVATIVE_DIMS_FT['perpendicular']
+            elif "Angled" in p_type:
+                dims_ft = CONSERVATIVE_DIMS_FT['angled']
+            else:  # Parallel
+                dims_ft = CONSERVATIVE_DIMS_FT['parallel']
+            
             # Check which calculation method is being used
             if calculation_method == "Area per Space (ITE Standard)":
                 # For Area per Space method, back-calculate dimensions to achieve target
@@ -967,45 +1182,21 @@ with col1:
                 # This gives: 9' × (19' + 13') = 9' × 32' = 288 sf per space for perpendicular
                 
                 # Scale up proportionally to hit target area per space
-                target_area_sf = area_per_space * area_conversion  # Convert to sf
+                target_area_sf = area_per_space * SQFT_PER_SQM  # area_per_space is stored in m²
                 conservative_base_area = 288  # 9' × 32' (space + half aisle)
                 scale_factor = (target_area_sf / conservative_base_area) ** 0.5
                 
-                if "Perpendicular" in p_type or "Compact" in p_type:
-                    space_w = (9.0 * scale_factor) / length_conversion
-                    space_l = (19.0 * scale_factor) / length_conversion
-                    aisle_w = (26.0 * scale_factor) / length_conversion
-                elif "Angled" in p_type:
-                    space_w = (9.0 * scale_factor) / length_conversion
-                    space_l = (20.0 * scale_factor) / length_conversion
-                    aisle_w = (16.0 * scale_factor) / length_conversion
-                else:  # Parallel
-                    space_w = (9.0 * scale_factor) / length_conversion
-                    space_l = (24.0 * scale_factor) / length_conversion
-                    aisle_w = (14.0 * scale_factor) / length_conversion
-                
                 add_app_log(f"Conservative mode scaled to achieve {target_area_sf:.0f} sf/space", "INFO")
             
             else:
-                # For Efficiency Factor method, use fixed conservative dimensions
-                if "Perpendicular" in p_type or "Compact" in p_type:
-                    # Conservative perpendicular: 9' x 19' spaces, 26' aisles
-                    space_w = 9.0 / length_conversion  # 9 ft (2.74m)
-                    space_l = 19.0 / length_conversion  # 19 ft (5.79m)
-                    aisle_w = 26.0 / length_conversion  # 26 ft (7.92m)
-                elif "Angled" in p_type:
-                    # Conservative angled: 9' x 20' spaces, 16' aisles
-                    space_w = 9.0 / length_conversion
-                    space_l = 20.0 / length_conversion
-                    aisle_w = 16.0 / length_conversion
-                else:  # Parallel
-                    # Conservative parallel: 9' x 24' spaces, 14' aisles
-                    space_w = 9.0 / length_conversion
-                    space_l = 24.0 / length_conversion
-                    aisle_w = 14.0 / length_conversion
+                # For Efficiency Factor method, use the fixed conservative dimensions
+                scale_factor = 1.0
+            
+            # Dimensions are in feet; convert to meters regardless of the display units
+            space_w, space_l, aisle_w = ((dim * scale_factor) / FEET_PER_METER for dim in dims_ft)
             
             # Add perimeter buffer (landscaping requirement: 10 ft)
-            perimeter_buffer = 10.0 / length_conversion  # 10 ft (3.05m)
+            perimeter_buffer = 10.0 / FEET_PER_METER  # 10 ft (3.05m)
                         
         else:
             # OPTIMIZED MODE: Use user's specified dimensions from params
@@ -1018,12 +1209,14 @@ with col1:
             aisle_w = params['aisle_width']
         
         # Convert polygon to Shapely polygon (in lat/lon)
-        poly_latlon = Polygon([(lon, lat) for lon, lat in polygon_coords])
+        poly_latlon = Polygon(polygon_coords)
+        # Prepare once; every candidate space is tested against this polygon
+        shapely.prepare(poly_latlon)
         bounds = poly_latlon.bounds  # (minx, miny, maxx, maxy)
         
         # Calculate approximate meters per degree at this latitude
         center_lat = (bounds[1] + bounds[3]) / 2
-        lon_to_m = 111320 * np.cos(np.radians(center_lat))
+        lon_to_m = 111320 * math.cos(math.radians(center_lat))
         lat_to_m = 110540
         
         # Apply perimeter buffer for conservative mode
@@ -1076,8 +1269,8 @@ with col1:
                 popup='Usable Parking Area'
             ).add_to(m)
         
-        # Generate parking spaces
-        parking_spaces = []
+        # Generate parking spaces, collected as (n, 5, 2) arrays of closed lon/lat rings
+        space_batches = []
 
         # Analyze polygon dimensions
         poly_width = bounds[2] - bounds[0]
@@ -1115,131 +1308,75 @@ with col1:
             use_columns = False
             use_perimeter_center = False
 
-        def create_space_coords(x, y, width_deg, length_deg, orientation='horizontal', direction=1, angle_rad=0):
-            """Create parking space coordinates"""
+        # Dimensions in degrees, computed once for every layout below
+        space_w_deg = space_w / lon_to_m
+        space_l_deg = space_l / lat_to_m
+        aisle_w_deg = aisle_w / lat_to_m
+        aisle_w_deg_lon = aisle_w / lon_to_m
+        
+        def strip_positions(start, stop, step):
+            """Offsets start, start + step, ... below stop; each one is start + i * step, so no drift builds up"""
+            count = max(int(np.ceil((stop - start) / step)), 0) + 1
+            positions = start + step * np.arange(count)
+            return positions[positions < stop]
+        
+        def strip_anchors(start, stop, depth_deg, aisle_deg):
+            """Start of each row/column below stop; strips alternate facing, starting forward"""
+            # A forward-facing strip pushes the next one out by its depth plus an aisle, a
+            # backward-facing one by just the aisle, so the steps alternate between the two
+            count = max(int(np.ceil(2 * (stop - start) / (depth_deg + 2 * aisle_deg))), 0) + 2
+            steps = np.resize([depth_deg + aisle_deg, aisle_deg], count)
+            anchors = np.add.accumulate(np.r_[start, steps])
+            return anchors[anchors < stop]
+        
+        def box_rings(x0, x1, y0, y1):
+            """Closed rings, shape (..., 5, 2), of the axis-aligned boxes spanned by broadcastable edge arrays"""
+            corners = np.broadcast_arrays(x0, y0, x1, y0, x1, y1, x0, y1, x0, y0)
+            return np.stack(corners, axis=-1).reshape(corners[0].shape + (5, 2))
+        
+        def add_rings(ring_x, ring_y):
+            """Add the candidate spaces (closed rings, last axis of 5 points) whose centre is in the lot"""
+            ring_x = ring_x.reshape(-1, 5)
+            ring_y = ring_y.reshape(-1, 5)
+            # Centroid of a rectangle or parallelogram is the mean of its four corners
+            cx = (ring_x[:, 0] + ring_x[:, 1] + ring_x[:, 2] + ring_x[:, 3]) / 4
+            cy = (ring_y[:, 0] + ring_y[:, 1] + ring_y[:, 2] + ring_y[:, 3]) / 4
+            # For a point, intersects is covers: a centre exactly on the lot boundary still counts
+            keep = shapely.intersects_xy(poly_latlon, cx, cy)
+            space_batches.append(np.stack([ring_x[keep], ring_y[keep]], axis=-1))
+        
+        def add_grid(anchors, positions, orientation, angle_rad=0):
+            """Add every space of a set of rows (or columns) in one pass, in row-by-row order"""
+            # Forward and backward facing ring offsets, picked per strip by its parity
+            facing_offsets = np.array([
+                space_offsets(space_w_deg, space_l_deg, orientation, direction, angle_rad)
+                for direction in (1, -1)
+            ], dtype=float)
+            offsets = facing_offsets[np.arange(len(anchors)) % 2][:, np.newaxis]
             if orientation == 'horizontal':
-                if angle_rad == 0:  # Perpendicular
-                    if direction == 1:
-                        return [
-                            (x, y),
-                            (x + width_deg, y),
-                            (x + width_deg, y + length_deg),
-                            (x, y + length_deg),
-                            (x, y)
-                        ]
-                    else:
-                        return [
-                            (x, y),
-                            (x + width_deg, y),
-                            (x + width_deg, y - length_deg),
-                            (x, y - length_deg),
-                            (x, y)
-                        ]
-                else:  # Angled
-                    offset = length_deg * np.sin(angle_rad)
-                    if direction == 1:
-                        return [
-                            (x, y),
-                            (x + width_deg, y),
-                            (x + width_deg + offset, y + length_deg * np.cos(angle_rad)),
-                            (x + offset, y + length_deg * np.cos(angle_rad)),
-                            (x, y)
-                        ]
-                    else:
-                        return [
-                            (x, y),
-                            (x + width_deg, y),
-                            (x + width_deg - offset, y - length_deg * np.cos(angle_rad)),
-                            (x - offset, y - length_deg * np.cos(angle_rad)),
-                            (x, y)
-                        ]
-            else:  # vertical orientation
-                if angle_rad == 0:  # Perpendicular
-                    if direction == 1:
-                        return [
-                            (x, y),
-                            (x + length_deg, y),
-                            (x + length_deg, y + width_deg),
-                            (x, y + width_deg),
-                            (x, y)
-                        ]
-                    else:
-                        return [
-                            (x, y),
-                            (x - length_deg, y),
-                            (x - length_deg, y + width_deg),
-                            (x, y + width_deg),
-                            (x, y)
-                        ]
-                else:  # Angled vertical
-                    offset = length_deg * np.sin(angle_rad)
-                    if direction == 1:
-                        return [
-                            (x, y),
-                            (x + length_deg * np.cos(angle_rad), y),
-                            (x + length_deg * np.cos(angle_rad), y + width_deg + offset),
-                            (x, y + width_deg + offset),
-                            (x, y)
-                        ]
-                    else:
-                        return [
-                            (x, y),
-                            (x - length_deg * np.cos(angle_rad), y),
-                            (x - length_deg * np.cos(angle_rad), y + width_deg - offset),
-                            (x, y + width_deg - offset),
-                            (x, y)
-                        ]
+                X, Y = np.meshgrid(positions, anchors)
+            else:
+                X, Y = np.meshgrid(anchors, positions, indexing='ij')
+            add_rings(X[..., np.newaxis] + offsets[..., 0], Y[..., np.newaxis] + offsets[..., 1])
 
-        # PERIMETER + CENTER LAYOUT
-        # PERIMETER + CENTER LAYOUT (CORRECTED - NO OVERLAPS)
+        # Corner islands are drawn every run, so they're set up outside the cached generation below
         if use_perimeter_center:
-            space_w_deg = space_w / lon_to_m
-            space_l_deg = space_l / lat_to_m
-            aisle_w_deg = aisle_w / lat_to_m
-            aisle_w_deg_lon = aisle_w / lon_to_m
-            
             # ALWAYS define corner exclusion zones
             corner_size_deg_lon = corner_island_size / lon_to_m
             corner_size_deg_lat = corner_island_size / lat_to_m
-
-            corner_exclusion_zones = [
-                Polygon([
-                    (bounds[0], bounds[3] - corner_size_deg_lat),
-                    (bounds[0] + corner_size_deg_lon, bounds[3] - corner_size_deg_lat),
-                    (bounds[0] + corner_size_deg_lon, bounds[3]),
-                    (bounds[0], bounds[3])
-                ]),
-                Polygon([
-                    (bounds[2] - corner_size_deg_lon, bounds[3] - corner_size_deg_lat),
-                    (bounds[2], bounds[3] - corner_size_deg_lat),
-                    (bounds[2], bounds[3]),
-                    (bounds[2] - corner_size_deg_lon, bounds[3])
-                ]),
-                Polygon([
-                    (bounds[0], bounds[1]),
-                    (bounds[0] + corner_size_deg_lon, bounds[1]),
-                    (bounds[0] + corner_size_deg_lon, bounds[1] + corner_size_deg_lat),
-                    (bounds[0], bounds[1] + corner_size_deg_lat)
-                ]),
-                Polygon([
-                    (bounds[2] - corner_size_deg_lon, bounds[1]),
-                    (bounds[2], bounds[1]),
-                    (bounds[2], bounds[1] + corner_size_deg_lat),
-                    (bounds[2] - corner_size_deg_lon, bounds[1] + corner_size_deg_lat)
-                ])
-            ]
-
-            def conflicts_with_corners(space_poly):
-                """Check if parking space conflicts with corner exclusion zones"""
-                for corner_zone in corner_exclusion_zones:
-                    if space_poly.intersects(corner_zone) or corner_zone.contains(space_poly.centroid):
-                        return True
-                return False
-
+            
+            # Corner zones as a (4, 4) array of (minx, miny, maxx, maxy) boxes
+            corner_exclusion_zones = np.array([
+                (bounds[0], bounds[3] - corner_size_deg_lat, bounds[0] + corner_size_deg_lon, bounds[3]),
+                (bounds[2] - corner_size_deg_lon, bounds[3] - corner_size_deg_lat, bounds[2], bounds[3]),
+                (bounds[0], bounds[1], bounds[0] + corner_size_deg_lon, bounds[1] + corner_size_deg_lat),
+                (bounds[2] - corner_size_deg_lon, bounds[1], bounds[2], bounds[1] + corner_size_deg_lat)
+            ])
+            
             # Only DRAW corner islands if checkbox enabled
             if include_corner_islands:
-                for corner_zone in corner_exclusion_zones:
-                    corner_coords = list(corner_zone.exterior.coords)
+                for zx0, zy0, zx1, zy1 in corner_exclusion_zones.tolist():
+                    corner_coords = [(zx0, zy0), (zx1, zy0), (zx1, zy1), (zx0, zy1), (zx0, zy0)]
                     folium.Polygon(
                         locations=[(lat, lon) for lon, lat in corner_coords],
                         color='#2d5016',
@@ -1249,7 +1386,33 @@ with col1:
                         fillOpacity=0.7,
                         popup='Corner Landscape Island'
                     ).add_to(m)
-            
+        
+        # Generation depends only on these inputs; when they match a recent run (e.g. only the
+        # basemap or an unrelated widget moved, or the mode was toggled back) reuse its spaces
+        layout_key = (
+            tuple(map(tuple, polygon_coords)), p_type, layout_orientation,
+            space_w, space_l, aisle_w, perimeter_buffer,
+            (corner_island_size, center_aisle_count) if use_perimeter_center else None
+        )
+        
+        layout_cache = st.session_state.layout_cache
+        if layout_key in layout_cache:
+            space_batches.append(layout_cache.pop(layout_key))
+        
+        # PERIMETER + CENTER LAYOUT
+        # PERIMETER + CENTER LAYOUT (CORRECTED - NO OVERLAPS)
+        elif use_perimeter_center:
+            def add_strip(x0, x1, y0, y1):
+                """Add the axis-aligned spaces whose centre is in the lot and that stay clear of the corners"""
+                x0, x1, y0, y1 = np.broadcast_arrays(x0, x1, y0, y1)
+                keep = shapely.intersects_xy(poly_latlon, (x0 + x1) / 2, (y0 + y1) / 2)
+                # Touching a corner zone counts as a conflict, same as Polygon.intersects;
+                # broadcast every space against all four zones at once
+                zx0, zy0, zx1, zy1 = corner_exclusion_zones.T[:, :, np.newaxis]
+                keep &= ~((x0 <= zx1) & (x1 >= zx0) & (y0 <= zy1) & (y1 >= zy0)).any(axis=0)
+                # Assemble the closed rings of all kept spaces as one (N, 5, 2) array
+                space_batches.append(box_rings(x0[keep], x1[keep], y0[keep], y1[keep]))
+
             # ===== CRITICAL: Calculate boundaries with NO OVERLAP =====
             # Perimeter spaces need: space_depth + aisle
             # Center needs to start AFTER perimeter spaces + another circulation aisle
@@ -1286,89 +1449,29 @@ with col1:
                 'top': bounds[3] - space_l_deg - (aisle_w_deg * 2)            # TOP perimeter + 2 aisles
             }
             
+            # Each perimeter strip is a regular run of spaces, so build and test a whole strip at once
+            xs = strip_positions(bounds[0], bounds[2], space_w_deg)
+            ys = strip_positions(bounds[1], bounds[3], space_w_deg)
+            
             # 1. TOP PERIMETER - Spaces facing DOWN (into lot)
-            current_x = bounds[0]
             # Spaces bottom at bounds[3] - aisle - space_depth, top at bounds[3] - aisle
             top_space_bottom = bounds[3] - aisle_w_deg - space_l_deg
-            
-            while current_x < bounds[2]:
-                space_coords = [
-                    (current_x, top_space_bottom),                      # Bottom-left
-                    (current_x + space_w_deg, top_space_bottom),        # Bottom-right
-                    (current_x + space_w_deg, top_space_bottom + space_l_deg),  # Top-right
-                    (current_x, top_space_bottom + space_l_deg),        # Top-left
-                    (current_x, top_space_bottom)
-                ]
-                
-                space_poly = Polygon(space_coords)
-                if poly_latlon.contains(space_poly.centroid) and not conflicts_with_corners(space_poly):
-                    display_coords = [[(lon, lat) for lon, lat in space_coords]]
-                    parking_spaces.append(display_coords)
-                
-                current_x += space_w_deg
+            add_strip(xs, xs + space_w_deg, top_space_bottom, top_space_bottom + space_l_deg)
             
             # 2. BOTTOM PERIMETER - Spaces facing UP (into lot)
-            current_x = bounds[0]
             # Spaces from bounds[1] to bounds[1] + space_depth
             bottom_space_bottom = bounds[1] + aisle_w_deg
-            
-            while current_x < bounds[2]:
-                space_coords = [
-                    (current_x, bottom_space_bottom),
-                    (current_x + space_w_deg, bottom_space_bottom),
-                    (current_x + space_w_deg, bottom_space_bottom + space_l_deg),
-                    (current_x, bottom_space_bottom + space_l_deg),
-                    (current_x, bottom_space_bottom)
-                ]
-                
-                space_poly = Polygon(space_coords)
-                if poly_latlon.contains(space_poly.centroid) and not conflicts_with_corners(space_poly):
-                    display_coords = [[(lon, lat) for lon, lat in space_coords]]
-                    parking_spaces.append(display_coords)
-                
-                current_x += space_w_deg
+            add_strip(xs, xs + space_w_deg, bottom_space_bottom, bottom_space_bottom + space_l_deg)
             
             # 3. LEFT PERIMETER - Spaces facing RIGHT (into lot)
-            current_y = bounds[1]
             # Spaces from bounds[0] to bounds[0] + space_depth
             left_space_left = bounds[0] + aisle_w_deg_lon
-            
-            while current_y < bounds[3]:
-                space_coords = [
-                    (left_space_left, current_y),
-                    (left_space_left + space_l_deg, current_y),
-                    (left_space_left + space_l_deg, current_y + space_w_deg),
-                    (left_space_left, current_y + space_w_deg),
-                    (left_space_left, current_y)
-                ]
-                
-                space_poly = Polygon(space_coords)
-                if poly_latlon.contains(space_poly.centroid) and not conflicts_with_corners(space_poly):
-                    display_coords = [[(lon, lat) for lon, lat in space_coords]]
-                    parking_spaces.append(display_coords)
-                
-                current_y += space_w_deg
+            add_strip(left_space_left, left_space_left + space_l_deg, ys, ys + space_w_deg)
             
             # 4. RIGHT PERIMETER - Spaces facing LEFT (into lot)
-            current_y = bounds[1]
             # Spaces from bounds[2] - space_depth to bounds[2]
             right_space_left = bounds[2] - space_l_deg - aisle_w_deg_lon
-            
-            while current_y < bounds[3]:
-                space_coords = [
-                    (right_space_left, current_y),
-                    (right_space_left + space_l_deg, current_y),
-                    (right_space_left + space_l_deg, current_y + space_w_deg),
-                    (right_space_left, current_y + space_w_deg),
-                    (right_space_left, current_y)
-                ]
-                
-                space_poly = Polygon(space_coords)
-                if poly_latlon.contains(space_poly.centroid) and not conflicts_with_corners(space_poly):
-                    display_coords = [[(lon, lat) for lon, lat in space_coords]]
-                    parking_spaces.append(display_coords)
-                
-                current_y += space_w_deg
+            add_strip(right_space_left, right_space_left + space_l_deg, ys, ys + space_w_deg)
             
             # 5. CENTER DOUBLE-LOADED ROWS (with proper clearance)
             center_height = center_bounds['top'] - center_bounds['bottom']
@@ -1388,272 +1491,99 @@ with col1:
                     first_row_y = center_y - (total_group_height / 2)
                     row_positions = [first_row_y + (i * row_spacing) for i in range(center_aisle_count)]
                 
+                center_xs = strip_positions(center_bounds['left'], center_bounds['right'], space_w_deg)
+                
                 for row_idx, row_center_y in enumerate(row_positions):
                     # Spaces on top of aisle (facing down)
-                    current_x = center_bounds['left']
                     aisle_top_y = row_center_y + (aisle_w_deg / 2)
-                    
-                    while current_x < center_bounds['right']:
-                        space_coords = [
-                            (current_x, aisle_top_y),
-                            (current_x + space_w_deg, aisle_top_y),
-                            (current_x + space_w_deg, aisle_top_y + space_l_deg),
-                            (current_x, aisle_top_y + space_l_deg),
-                            (current_x, aisle_top_y)
-                        ]
-                        
-                        space_poly = Polygon(space_coords)
-                        if poly_latlon.contains(space_poly.centroid) and not conflicts_with_corners(space_poly):
-                            display_coords = [[(lon, lat) for lon, lat in space_coords]]
-                            parking_spaces.append(display_coords)
-                        
-                        current_x += space_w_deg
+                    add_strip(center_xs, center_xs + space_w_deg, aisle_top_y, aisle_top_y + space_l_deg)
                     
                     # Spaces on bottom of aisle (facing up)
-                    current_x = center_bounds['left']
                     aisle_bottom_y = row_center_y - (aisle_w_deg / 2)
-                    
-                    while current_x < center_bounds['right']:
-                        space_coords = [
-                            (current_x, aisle_bottom_y - space_l_deg),
-                            (current_x + space_w_deg, aisle_bottom_y - space_l_deg),
-                            (current_x + space_w_deg, aisle_bottom_y),
-                            (current_x, aisle_bottom_y),
-                            (current_x, aisle_bottom_y - space_l_deg)
-                        ]
-                        
-                        space_poly = Polygon(space_coords)
-                        if poly_latlon.contains(space_poly.centroid) and not conflicts_with_corners(space_poly):
-                            display_coords = [[(lon, lat) for lon, lat in space_coords]]
-                            parking_spaces.append(display_coords)
-                        
-                        current_x += space_w_deg
+                    add_strip(center_xs, center_xs + space_w_deg, aisle_bottom_y - space_l_deg, aisle_bottom_y)
             else:
                 if center_aisle_count > 1:
                     add_app_log(f"Lot too small for {center_aisle_count} center rows", "WARNING")
 
         # ROW-BASED AND COLUMN-BASED LAYOUTS
+        # Every row (column) repeats the same space along it, so each layout is one grid of candidates
         elif "Perpendicular" in p_type or "Compact" in p_type:
             if use_rows:
-                current_y = bounds[1]
-                row_num = 0
-                
-                while current_y < bounds[3]:
-                    current_x = bounds[0]
-                    space_direction = 1 if row_num % 2 == 0 else -1
-                    
-                    while current_x < bounds[2]:
-                        space_w_deg = space_w / lon_to_m
-                        space_l_deg = space_l / lat_to_m
-                        
-                        space_coords = create_space_coords(
-                            current_x, current_y, space_w_deg, space_l_deg,
-                            orientation='horizontal', direction=space_direction
-                        )
-                        
-                        space_poly = Polygon(space_coords)
-                        if poly_latlon.contains(space_poly.centroid):
-                            display_coords = [[(lon, lat) for lon, lat in space_coords]]
-                            parking_spaces.append(display_coords)
-                        
-                        current_x += space_w_deg
-                    
-                    aisle_w_deg = aisle_w / lat_to_m
-                    current_y += (space_l_deg if space_direction == 1 else 0) + aisle_w_deg
-                    row_num += 1
+                row_ys = strip_anchors(bounds[1], bounds[3], space_l_deg, aisle_w_deg)
+                add_grid(row_ys, strip_positions(bounds[0], bounds[2], space_w_deg), 'horizontal')
             
             if use_columns:
-                current_x = bounds[0]
-                col_num = 0
-                
-                while current_x < bounds[2]:
-                    current_y = bounds[1]
-                    space_direction = 1 if col_num % 2 == 0 else -1
-                    
-                    while current_y < bounds[3]:
-                        space_w_deg = space_w / lon_to_m
-                        space_l_deg = space_l / lat_to_m
-                        
-                        space_coords = create_space_coords(
-                            current_x, current_y, space_w_deg, space_l_deg,
-                            orientation='vertical', direction=space_direction
-                        )
-                        
-                        space_poly = Polygon(space_coords)
-                        if poly_latlon.contains(space_poly.centroid):
-                            display_coords = [[(lon, lat) for lon, lat in space_coords]]
-                            parking_spaces.append(display_coords)
-                        
-                        current_y += space_w_deg
-                    
-                    aisle_w_deg = aisle_w / lon_to_m
-                    current_x += (space_l_deg if space_direction == 1 else 0) + aisle_w_deg
-                    col_num += 1
+                col_xs = strip_anchors(bounds[0], bounds[2], space_l_deg, aisle_w_deg_lon)
+                add_grid(col_xs, strip_positions(bounds[1], bounds[3], space_w_deg), 'vertical')
 
         elif "Angled" in p_type:
-            angle_rad = np.radians(45)
+            angle_rad = math.radians(45)
+            angled_depth_deg = space_l_deg * math.cos(angle_rad)
             
             if use_rows:
-                current_y = bounds[1]
-                row_num = 0
-                
-                while current_y < bounds[3]:
-                    current_x = bounds[0]
-                    angle_direction = 1 if row_num % 2 == 0 else -1
-                    
-                    while current_x < bounds[2]:
-                        space_w_deg = space_w / lon_to_m
-                        space_l_deg = space_l / lat_to_m
-                        
-                        space_coords = create_space_coords(
-                            current_x, current_y, space_w_deg, space_l_deg,
-                            orientation='horizontal', direction=angle_direction, angle_rad=angle_rad
-                        )
-                        
-                        space_poly = Polygon(space_coords)
-                        if poly_latlon.contains(space_poly.centroid):
-                            display_coords = [[(lon, lat) for lon, lat in space_coords]]
-                            parking_spaces.append(display_coords)
-                        
-                        current_x += space_w_deg
-                    
-                    aisle_w_deg = aisle_w / lat_to_m
-                    current_y += (space_l_deg * np.cos(angle_rad) if angle_direction == 1 else 0) + aisle_w_deg
-                    row_num += 1
+                row_ys = strip_anchors(bounds[1], bounds[3], angled_depth_deg, aisle_w_deg)
+                add_grid(row_ys, strip_positions(bounds[0], bounds[2], space_w_deg),
+                         'horizontal', angle_rad)
             
             if use_columns:
-                current_x = bounds[0]
-                col_num = 0
-                
-                while current_x < bounds[2]:
-                    current_y = bounds[1]
-                    angle_direction = 1 if col_num % 2 == 0 else -1
-                    
-                    while current_y < bounds[3]:
-                        space_w_deg = space_w / lon_to_m
-                        space_l_deg = space_l / lat_to_m
-                        
-                        space_coords = create_space_coords(
-                            current_x, current_y, space_w_deg, space_l_deg,
-                            orientation='vertical', direction=angle_direction, angle_rad=angle_rad
-                        )
-                        
-                        space_poly = Polygon(space_coords)
-                        if poly_latlon.contains(space_poly.centroid):
-                            display_coords = [[(lon, lat) for lon, lat in space_coords]]
-                            parking_spaces.append(display_coords)
-                        
-                        current_y += space_w_deg
-                    
-                    aisle_w_deg = aisle_w / lon_to_m
-                    current_x += (space_l_deg * np.cos(angle_rad) if angle_direction == 1 else 0) + aisle_w_deg
-                    col_num += 1
+                col_xs = strip_anchors(bounds[0], bounds[2], angled_depth_deg, aisle_w_deg_lon)
+                add_grid(col_xs, strip_positions(bounds[1], bounds[3], space_w_deg),
+                         'vertical', angle_rad)
 
         elif "Parallel" in p_type:
-            current_x = bounds[0]
-            
-            while current_x < bounds[2]:
-                space_w_deg = space_w / lon_to_m
-                space_l_deg = space_l / lat_to_m
-                
-                # Bottom edge
-                space_coords = [
-                    (current_x, bounds[1]),
-                    (current_x + space_l_deg, bounds[1]),
-                    (current_x + space_l_deg, bounds[1] + space_w_deg),
-                    (current_x, bounds[1] + space_w_deg),
-                    (current_x, bounds[1])
-                ]
-                
-                space_poly = Polygon(space_coords)
-                if poly_latlon.contains(space_poly.centroid):
-                    display_coords = [[(lon, lat) for lon, lat in space_coords]]
-                    parking_spaces.append(display_coords)
-                
-                # Top edge
-                space_coords = [
-                    (current_x, bounds[3] - space_w_deg),
-                    (current_x + space_l_deg, bounds[3] - space_w_deg),
-                    (current_x + space_l_deg, bounds[3]),
-                    (current_x, bounds[3]),
-                    (current_x, bounds[3] - space_w_deg)
-                ]
-                
-                space_poly = Polygon(space_coords)
-                if poly_latlon.contains(space_poly.centroid):
-                    display_coords = [[(lon, lat) for lon, lat in space_coords]]
-                    parking_spaces.append(display_coords)
-                
-                current_x += space_l_deg
+            # Bottom and top edges, alternating per position: (positions, 2 edges) boxes
+            xs = strip_positions(bounds[0], bounds[2], space_l_deg)[:, np.newaxis]
+            horizontal = box_rings(xs, xs + space_l_deg,
+                                   np.array([bounds[1], bounds[3] - space_w_deg]),
+                                   np.array([bounds[1] + space_w_deg, bounds[3]]))
             
-            current_y = bounds[1]
+            # Left and right edges
+            ys = strip_positions(bounds[1], bounds[3], space_l_deg)[:, np.newaxis]
+            vertical = box_rings(np.array([bounds[0], bounds[2] - space_w_deg]),
+                                 np.array([bounds[0] + space_w_deg, bounds[2]]),
+                                 ys, ys + space_l_deg)
             
-            while current_y < bounds[3]:
-                space_w_deg = space_w / lon_to_m
-                space_l_deg = space_l / lat_to_m
-                
-                # Left edge
-                space_coords = [
-                    (bounds[0], current_y),
-                    (bounds[0] + space_w_deg, current_y),
-                    (bounds[0] + space_w_deg, current_y + space_l_deg),
-                    (bounds[0], current_y + space_l_deg),
-                    (bounds[0], current_y)
-                ]
-                
-                space_poly = Polygon(space_coords)
-                if poly_latlon.contains(space_poly.centroid):
-                    display_coords = [[(lon, lat) for lon, lat in space_coords]]
-                    parking_spaces.append(display_coords)
-                
-                # Right edge
-                space_coords = [
-                    (bounds[2] - space_w_deg, current_y),
-                    (bounds[2], current_y),
-                    (bounds[2], current_y + space_l_deg),
-                    (bounds[2] - space_w_deg, current_y + space_l_deg),
-                    (bounds[2] - space_w_deg, current_y)
-                ]
-                
-                space_poly = Polygon(space_coords)
-                if poly_latlon.contains(space_poly.centroid):
-                    display_coords = [[(lon, lat) for lon, lat in space_coords]]
-                    parking_spaces.append(display_coords)
-                
-                current_y += space_l_deg
+            # All four edges go through a single containment test
+            rings = np.concatenate([horizontal.reshape(-1, 5, 2), vertical.reshape(-1, 5, 2)])
+            add_rings(rings[..., 0], rings[..., 1])
         
-        # Add parking spaces to map
-        for space_coords in parking_spaces:
-            folium.Polygon(
-                locations=[(lat, lon) for lon, lat in space_coords[0]],
-                color='#FFA500',
-                weight=2,
-                fill=True,
-                fillColor='#FFD700',
-                fillOpacity=0.3,
-                popup='Parking Space'
-            ).add_to(m)
+        # All spaces as one (spaces, 5, 2) array
+        space_rings = np.concatenate(space_batches) if space_batches else np.empty((0, 5, 2))
+        
+        layout_cache[layout_key] = space_rings
+        while len(layout_cache) > LAYOUT_CACHE_ENTRIES:
+            del layout_cache[next(iter(layout_cache))]
+        
+        # Add parking spaces to map as one GeoJSON layer (GeoJSON is lon/lat, same as the rings)
+        # rather than one folium.Polygon, and one block of generated JS, per space
+        folium.GeoJson(
+            {
+                'type': 'FeatureCollection',
+                'features': [
+                    {'type': 'Feature', 'geometry': {'type': 'Polygon', 'coordinates': [ring]}, 'properties': {}}
+                    for ring in space_rings.tolist()
+                ]
+            },
+            style_function=lambda feature: PARKING_SPACE_STYLE,
+            popup=folium.Popup('Parking Space')
+        ).add_to(m)
         
         # Store actual number of spaces drawn WITH layout type
-        st.session_state.actual_spaces_drawn = len(parking_spaces)
+        st.session_state.actual_spaces_drawn = len(space_rings)
         st.session_state.current_layout_type = "conservative" if st.session_state.get('show_conservative', False) else "optimized"
 
         # Store both values separately for comparison
         if st.session_state.get('show_conservative', False):
-            st.session_state.conservative_spaces = len(parking_spaces)
+            st.session_state.conservative_spaces = len(space_rings)
         else:
-            st.session_state.optimized_spaces = len(parking_spaces)
+            st.session_state.optimized_spaces = len(space_rings)
         
-        # Store parking spaces for 3D visualization
-        parking_spaces_3d = []
-        for space in parking_spaces:
-            parking_spaces_3d.append({
-                'coords': space[0],
-                'type': 'parking'
-            })
-        st.session_state.parking_spaces_3d = parking_spaces_3d
+        # Store parking spaces for 3D visualization, quantized to 6 decimals (~11 cm), as one
+        # (spaces, 4, 2) corner array with open rings (deck.gl closes them) so the 3D view
+        # only has to offset it per level
+        st.session_state.parking_spaces_3d_array = np.round(space_rings[:, :4], 6)
         
-        add_app_log(f"Drew {len(parking_spaces)} parking spaces on map", "INFO")
+        add_app_log(f"Drew {len(space_rings)} parking spaces on map", "INFO")
         
         # Add legend
         legend_html = '''
@@ -1663,13 +1593,13 @@ with col1:
                     font-size:14px; padding: 10px">
         <p style="margin: 0; color: black;"><strong>Legend</strong></p>
         <p style="margin: 5px 0; color: black;"><span style="color: #FFA500;">■</span> Parking Space</p>
-        <p style="margin: 5px 0; font-size: 12px; color: black;">Total: ''' + str(len(parking_spaces)) + ''' spaces</p>
+        <p style="margin: 5px 0; font-size: 12px; color: black;">Total: ''' + str(len(space_rings)) + ''' spaces</p>
         </div>
         '''
         m.get_root().html.add_child(folium.Element(legend_html))
     
-    # Display map
-    map_data = st_folium(m, width=800, height=600, key="map")
+    # Display map; only drawings are read back, so panning, zooming and clicks don't rerun the app
+    map_data = st_folium(m, width=800, height=600, key="map", returned_objects=["all_drawings"])
 
 with col2:
     st.subheader("Results")
@@ -1682,58 +1612,25 @@ with col2:
             last_drawing = drawings[-1]
             
             if last_drawing['geometry']['type'] in ['Polygon', 'Rectangle']:
-                coords = last_drawing['geometry']['coordinates'][0]
+                # Quantize to 6 decimals (~11 cm); full JS double precision only bloats every rerun's payload
+                coords = [[round(lon, 6), round(lat, 6)] for lon, lat in last_drawing['geometry']['coordinates'][0]]
+                previous_coords = st.session_state.polygon_coords
                 st.session_state.polygon_coords = coords
                 
-                lats = [coord[1] for coord in coords]
-                lons = [coord[0] for coord in coords]
-                center_lat = sum(lats) / len(lats)
-                center_lon = sum(lons) / len(lons)
+                center_lon, center_lat = np.asarray(coords, dtype=np.float64).mean(axis=0).tolist()
                 st.session_state.polygon_center = [center_lat, center_lon]
                 st.session_state.polygon_zoom = 19
                 
-                add_app_log(f"Captured polygon center: [{center_lat:.6f}, {center_lon:.6f}]", "INFO")
-                
-                lat_to_m = 111000
-                lon_to_m = 82000
+                if coords != previous_coords:
+                    add_app_log(f"Captured polygon center: [{center_lat:.6f}, {center_lon:.6f}]", "INFO")
+                    add_app_log(f"Polygon drawn with {len(coords)} vertices", "INFO")
                 
-                add_app_log(f"Polygon drawn with {len(coords)} vertices", "INFO")
-                
-                coords_m = [(lon * lon_to_m, lat * lat_to_m) for lon, lat in coords]
-                poly = Polygon(coords_m)
-                area_m2 = poly.area
-                
-                add_app_log(f"Calculated area: {area_m2:,.1f} m²", "INFO")
-                
-                space_area = space_width * space_length
-                
-                if calculation_method == "Area per Space (ITE Standard)":
-                    estimated_spaces_per_level = int(area_m2 / area_per_space)
-                    calc_method_stored = "Area per Space (ITE Standard)"
-                    area_per_space_stored = area_per_space
-                else:
-                    estimated_spaces_per_level = int((area_m2 * efficiency) / space_area)
-                    calc_method_stored = "Efficiency Factor"
-                    area_per_space_stored = area_m2 / estimated_spaces_per_level if estimated_spaces_per_level > 0 else space_area / efficiency
-                
-                estimated_spaces = estimated_spaces_per_level * num_levels
-                
-                add_app_log(f"Estimated parking spaces: {estimated_spaces} ({estimated_spaces_per_level}/level × {num_levels} levels)", "INFO")
-                
-                st.session_state.calculation_results = {
-                    'area_m2': area_m2,
-                    'space_area': space_area,
-                    'estimated_spaces': estimated_spaces,
-                    'estimated_spaces_per_level': estimated_spaces_per_level,
-                    'num_levels': num_levels,
-                    'efficiency': efficiency,
-                    'space_width': space_width,
-                    'space_length': space_length,
-                    'aisle_width': aisle_width,
-                    'calculation_method': calc_method_stored,
-                    'area_per_space': area_per_space_stored,
-                    'structure_type': structure_type
-                }
+                # area_per_space is only defined (and only used) for the ITE method
+                ite_area_per_space = area_per_space if calculation_method == "Area per Space (ITE Standard)" else None
+                st.session_state.calculation_results = estimate_capacity(
+                    coords, calculation_method, ite_area_per_space, efficiency,
+                    space_width, space_length, aisle_width, num_levels, structure_type
+                )
     
     # Display results
     if st.session_state.calculation_results:
@@ -1747,7 +1644,7 @@ with col2:
             st.metric("Total Lot Area (per level)", f"{results['area_m2'] * area_conversion:,.1f} {area_unit}")
         else:
             st.metric("Total Lot Area (per level)", f"{results['area_m2']:,.1f} {area_unit}")
-            st.caption(f"= {results['area_m2'] * 10.764:,.1f} ft²")
+            st.caption(f"= {results['area_m2'] * SQFT_PER_SQM:,.1f} ft²")
         
         st.markdown("---")
         st.markdown("### 📊 Capacity Comparison")
@@ -1915,7 +1812,7 @@ with col2:
                     st.session_state.optimized_spaces = None
                     st.session_state.conservative_spaces = None
                     st.session_state.current_layout_type = None
-                    st.session_state.parking_spaces_3d = None
+                    st.session_state.parking_spaces_3d_array = None
                     add_app_log(f"User cleared parking layout and results", "INFO")
                     st.rerun()
     else: